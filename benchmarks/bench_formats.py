@@ -0,0 +1,31 @@
+"""Encode time and output bytes per watermark output format.
+
+    python benchmarks/bench_formats.py
+"""
+
+import time
+
+from common import ensure_watermark, sample_image
+
+import success_overlay
+
+SIZES = [(750, 1334), (1170, 2532), (3000, 3000)]
+FORMATS = list(success_overlay.OUTPUT_FORMATS) + ["auto"]
+
+
+def main():
+    wm_path = ensure_watermark()
+    print(f"{'size':>11} {'format':>6} {'chosen':>6} {'q':>3} {'encodes':>7} {'bytes':>10} {'ms':>7}")
+    for W, H in SIZES:
+        data = sample_image(W, H, "PNG")
+        success_overlay.render_watermark(data, wm_path)  # warm the overlay cache
+        for fmt in FORMATS:
+            t0 = time.perf_counter()
+            res = success_overlay.render_watermark(data, wm_path, output_format=fmt)
+            ms = (time.perf_counter() - t0) * 1e3
+            print(f"{W:>5}x{H:<5} {fmt:>6} {res.format:>6} {res.quality:>3} {res.encodes:>7} "
+                  f"{res.buf.getbuffer().nbytes:>10} {ms:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
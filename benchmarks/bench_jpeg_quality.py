@@ -0,0 +1,47 @@
+"""Compare the predictive JPEG quality search with the old 90, 82, 74 ... ladder.
+
+    python benchmarks/bench_jpeg_quality.py
+"""
+
+import io
+import time
+
+from common import sample_image
+
+from PIL import Image
+
+import success_overlay
+
+SIZES = [(1170, 2532), (3000, 3000)]
+# Byte targets as a fraction of the image's size at quality 90
+TARGET_FRACTIONS = [2.0, 0.9, 0.6, 0.4, 0.2]
+
+
+def ladder(img, target):
+    quality, encodes = 90, 0
+    while True:
+        encodes += 1
+        buf = success_overlay._encode(img, quality)
+        if buf.tell() <= target or quality <= 30:
+            return quality, encodes
+        quality = max(30, quality - 8)
+
+
+def main():
+    print(f"{'size':>11} {'target':>7} | {'old q':>5} {'enc':>3} {'ms':>6} | {'new q':>5} {'enc':>3} {'probes':>6} {'ms':>6}")
+    for W, H in SIZES:
+        img = Image.open(io.BytesIO(sample_image(W, H, "PNG"))).convert("RGB")
+        full = success_overlay._encode(img, 90).tell()
+        for frac in TARGET_FRACTIONS:
+            target = int(full * frac)
+            t0 = time.perf_counter()
+            old_q, old_enc = ladder(img, target)
+            t1 = time.perf_counter()
+            res = success_overlay.encode_within(img, target)
+            t2 = time.perf_counter()
+            print(f"{W:>5}x{H:<5} {frac:>7} | {old_q:>5} {old_enc:>3} {(t1 - t0) * 1e3:>6.0f} | "
+                  f"{res.quality:>5} {res.encodes:>3} {res.probes:>6} {(t2 - t1) * 1e3:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Compare the per-tile overlay loop with the row-stamping builder.
+
+    python benchmarks/bench_overlay.py
+"""
+
+from common import best_of, ensure_watermark
+
+import success_overlay
+
+SIZES = [(750, 1334), (1170, 2532), (2000, 2000), (3000, 3000)]
+SCALES = [0.5, 0.25, 0.1, 0.05]
+MARGINS = (20, 20)
+
+
+def main():
+    wm_path = ensure_watermark()
+    mx, my = MARGINS
+    print(f"{'size':>11} {'scale':>6} {'tiles':>6} {'loop ms':>9} {'rows ms':>9} {'speedup':>8}  identical")
+    for W, H in SIZES:
+        for scale in SCALES:
+            w_w = max(1, int(W * scale))
+            wm = success_overlay._prepared_watermark(wm_path, 0, w_w, 0.2)
+            cols = len(range(0, W, w_w + mx))
+            rows = len(range(0, H, wm.height + my))
+
+            loop = best_of(lambda: success_overlay._tile_overlay_loop(W, H, wm, mx, my))
+            fast = best_of(lambda: success_overlay._tile_overlay_rows(W, H, wm, mx, my))
+            same = (success_overlay._tile_overlay_loop(W, H, wm, mx, my).tobytes()
+                    == success_overlay._tile_overlay_rows(W, H, wm, mx, my).tobytes())
+            print(f"{W:>5}x{H:<5} {scale:>6} {cols * rows:>6} {loop * 1e3:>9.2f} {fast * 1e3:>9.2f} "
+                  f"{loop / fast:>7.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
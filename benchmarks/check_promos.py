@@ -0,0 +1,105 @@
+"""Check enrich_promos against the golden corpus and a randomized reference run.
+
+    python benchmarks/check_promos.py
+
+expected_promos.json was recorded with the original one-regex-per-signal
+enrich_promos; reference_promos() below is that implementation, kept so the
+keyword-gated version can also be fuzzed against it.
+"""
+
+import html
+import json
+import os
+import random
+import sys
+
+from common import CORPUS_DIR
+
+import embed_generator as eg
+
+
+FRAGMENTS = [
+    "code", "coupon", "code: ab12cd", "Coupon-SAVE20", "today only", "TODAY ONLY", "through", "thru sep 5",
+    "Through Dec 24", "while supplies last", "bogo", "BOGO!", "buy one, get one", "buy  one,get one", "free",
+    "with purchase", "w/ purchase", "glitch", "price  glitched", "glitchy", "vcc", "vccode", "VCC", "birthday",
+    "bİrthday", "ſ", "ı", "dyor", "DYOR", "dẙor", "$9.99", " ", " ", "\n", ",", "-", "🎂", "x", "42",
+]
+
+
+def reference_promos(text, message_date_iso):
+    parsed, t = {}, text
+    tags, risk, validity = set(), set(), {}
+    m = eg.CODE_RE.search(t)
+    if m:
+        parsed["code"] = m.group(1)
+        tags.add("has-code")
+    if eg.TODAY_ONLY_RE.search(t) and message_date_iso:
+        validity["type"] = "date"
+        validity["end"] = message_date_iso
+        tags.add("today-only")
+    m = eg.THRU_RE.search(t)
+    if m and message_date_iso:
+        mon, day = m.group(1)[:3].title(), int(m.group(2))
+        mon_num = eg.MONTHS.get(mon, None)
+        if mon_num:
+            validity["type"] = "date"
+            validity["end"] = f"{int(message_date_iso[:4]):04d}-{mon_num:02d}-{day:02d}"
+    if eg.WHILE_SUPPLIES_RE.search(t):
+        validity["disclaimer"] = "while-supplies-last"
+    if eg.BOGO_RE.search(t):
+        tags.update(("promo", "bogo"))
+    if eg.FREE_WP_RE.search(t):
+        tags.update(("promo", "free-with-purchase"))
+    if eg.GLITCH_RE.search(t):
+        tags.update(("glitch", "YMMV"))
+        risk.add("pricing-glitch")
+    if eg.VCC_RE.search(t):
+        tags.add("VCC-recommended")
+        risk.add("payment-caution")
+    if eg.BIRTHDAY_RE.search(t):
+        tags.update(("freebies", "birthday"))
+    if "DYOR" in t.upper():
+        tags.add("DYOR")
+        risk.add("needs-research")
+    if tags:
+        parsed["tags"] = sorted(tags)
+    if risk:
+        parsed["risk"] = sorted(risk)
+    if validity:
+        parsed["validity"] = validity
+    return parsed
+
+
+def promos(text, message_date_iso):
+    parsed = {}
+    eg.enrich_promos(parsed, text, message_date_iso)
+    return parsed
+
+
+def main(fuzz_cases=20000):
+    with open(os.path.join(CORPUS_DIR, "messages.json"), encoding="utf-8") as f:
+        messages = json.load(f)
+    with open(os.path.join(CORPUS_DIR, "expected_promos.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+
+    failures = 0
+    for msg in messages:
+        got = promos(html.unescape(msg["text"]), msg["created_at"][:10])
+        if got != expected[msg["id"]]:
+            failures += 1
+            print(f"GOLDEN MISMATCH {msg['id']}:\n  expected {expected[msg['id']]}\n  got      {got}")
+
+    rng = random.Random(1234)
+    for _ in range(fuzz_cases):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 12)))
+        date = rng.choice([None, "2025-08-14"])
+        if promos(text, date) != reference_promos(text, date):
+            failures += 1
+            print(f"FUZZ MISMATCH {text!r}")
+
+    print(f"{len(messages)} golden messages, {fuzz_cases} fuzz cases, {failures} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Check that starting watermark workers doesn't start (or import) the bot.
+
+    python benchmarks/check_worker_startup.py
+
+Watermark workers re-run the main script as __mp_main__. This runs
+fractored-mirror-bot.py the way a worker does and checks that it imports
+nothing. It then imports mirror_bot in an empty directory and checks that
+nothing gets built or written. Finally it starts a real WatermarkEngine pool
+and asks a worker which modules it has loaded.
+"""
+
+import asyncio
+import os
+import runpy
+import sys
+import tempfile
+
+from common import REPO_ROOT, ensure_watermark, sample_image
+
+# Anything a worker shouldn't need
+BOT_MODULES = {"mirror_bot", "discord", "aiohttp", "dotenv", "ownership_store", "deal_store", "ttl_store", "preview_timing"}
+
+
+def worker_modules():
+    return sorted(BOT_MODULES & set(sys.modules))
+
+
+def check_launcher():
+    before = set(sys.modules)
+    runpy.run_path(os.path.join(REPO_ROOT, "fractored-mirror-bot.py"), run_name="__mp_main__")
+    loaded = sorted(BOT_MODULES & (set(sys.modules) - before))
+    print(f"launcher as __mp_main__: {'ok' if not loaded else 'imported ' + ', '.join(loaded)}")
+    return not loaded
+
+
+def check_import(workdir):
+    # Any IDs will do; importing only reads them
+    for name in ("TARGET", "MAJOR", "MINOR", "MEMBER", "FOOD", "SUCCESS", "ONLINE_FLIPS_ID", "SEASONAL_FLIPS_ID",
+                 "TARGET_FLIPS_ID", "THRIFT_FLIPS_ID", "WALMART_FLIPS_ID", "FLIGHT_DEALS_ID", "CHIPOTLE_ID",
+                 "FOOD_ANNOUNCEMENT_ID", "F_MAJOR", "F_MINOR", "F_MEMBER", "F_DEALS", "F_FOOD", "F_CHIPOTLE",
+                 "TEST_CHANNEL", "ONLINE_FLIPS_FID", "TARGET_FLIPS_FID", "WALMART_FLIPS_FID", "SEASONAL_FLIPS_FID",
+                 "THRIFT_FLIPS_FID", "FLIGHT_FLIPS_FID", "SMALL_PRICE_ERRORS_FID", "CHIPOTLE_FID", "FOOD_FID"):
+        os.environ.setdefault(name, "1")
+    import mirror_bot
+
+    built = [name for name in ("bot", "channels", "owners", "wm_engine", "preview_timings", "webhooks",
+                               "intake_queue") if getattr(mirror_bot, name) is not None]
+    written = os.listdir(workdir)
+    ok = not built and not written
+    print(f"import mirror_bot: {'ok' if ok else f'built {built}, wrote {written}'}")
+    return ok
+
+
+async def check_pool():
+    import watermark_engine
+
+    engine = watermark_engine.WatermarkEngine(workers=2)
+    try:
+        await engine.submit(sample_image(640, 480), watermark_path=ensure_watermark())
+        loaded = await asyncio.get_running_loop().run_in_executor(engine._pool, worker_modules)
+    finally:
+        await engine.close()
+    print(f"watermark worker: {'ok' if not loaded else 'has ' + ', '.join(loaded)}")
+    return not loaded
+
+
+def main():
+    ok = check_launcher()
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            ok = asyncio.run(check_pool()) and ok
+            ok = check_import(workdir) and ok
+        finally:
+            os.chdir(cwd)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
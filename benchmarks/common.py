@@ -0,0 +1,63 @@
+# Shared helpers for the benchmark scripts (run them from the repo root or this folder).
+
+import io
+import os
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+CORPUS_DIR = os.path.join(BENCH_DIR, "corpus")
+# After the script's own directory, but behind anything run.py --tree put first
+if REPO_ROOT not in sys.path:
+    sys.path.insert(1, REPO_ROOT)
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+
+def ensure_watermark() -> str:
+    """Path to watermark.png, or the corpus stand-in if the real one isn't checked out."""
+    real = os.path.join(REPO_ROOT, "watermark.png")
+    if os.path.exists(real):
+        return real
+    return os.path.join(CORPUS_DIR, "images", "watermark.png")
+
+
+def sample_image(w: int, h: int, fmt: str = "JPEG", seed: int = 0) -> bytes:
+    """Screenshot-ish test image: flat UI blocks with some noisy photo content."""
+    img = Image.new("RGB", (w, h), (245, 245, 245))
+    d = ImageDraw.Draw(img)
+    step = max(1, h // 12)
+    for i, y in enumerate(range(0, h, step)):
+        shade = (seed * 37 + i * 23) % 200
+        d.rectangle((w // 20, y + step // 6, w - w // 20, y + step // 2), fill=(shade, 120, 255 - shade))
+    photo = Image.effect_noise((w // 2 or 1, h // 3 or 1), 40 + seed).convert("RGB")
+    img.paste(photo, (w // 4, h // 3))
+    buf = io.BytesIO()
+    img.save(buf, fmt)
+    return buf.getvalue()
+
+
+def best_of(fn, repeat: int = 5, number: int = 1) -> float:
+    """Best wall time in seconds for one call of fn."""
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def corpus_message(record: dict):
+    """Stand-in for a discord.Message built from a corpus record (only what the parser reads)."""
+    from datetime import datetime
+    from types import SimpleNamespace
+
+    def content_type(url):
+        ext = url.split("?", 1)[0].rsplit(".", 1)[-1].lower()
+        return {"png": "image/png", "jpg": "image/jpeg", "jpeg": "image/jpeg",
+                "webp": "image/webp", "gif": "image/gif"}.get(ext)
+
+    return SimpleNamespace(
+        id=int(record["id"].split("-")[-1]),
+        content=record["text"],
+        created_at=datetime.fromisoformat(record["created_at"]),
+        attachments=[SimpleNamespace(url=u, content_type=content_type(u)) for u in record["attachments"]],
+        embeds=[SimpleNamespace(image=SimpleNamespace(url=u, proxy_url=None), thumbnail=None)
+                for u in record["embed_images"]],
+    )
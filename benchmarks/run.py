@@ -0,0 +1,222 @@
+"""Per-stage latency/allocation benchmark for the parse -> embed -> watermark pipeline.
+
+    python benchmarks/run.py                     # benchmark the working tree
+    python benchmarks/run.py --check             # also verify the golden parse outputs
+    python benchmarks/run.py --compare HEAD~3 HEAD
+
+Runs entirely offline on benchmarks/corpus (no Discord connection). --compare
+exports each revision with `git archive` and benchmarks it with this copy of
+the runner, so both sides are measured the same way on this machine.
+tracemalloc only sees Python-level allocations, so Pillow's pixel buffers are
+not included in the watermark stage's numbers.
+"""
+
+import argparse
+import asyncio
+import html
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import CORPUS_DIR, REPO_ROOT, corpus_message, ensure_watermark
+
+STAGES = [
+    "parse_extracted_text",
+    "parse_extracted_text (cached)",
+    "enrich_promos",
+    "embed_from_parsed",
+    "create_multiple_image_embeds",
+    "add_image_watermark",
+]
+SAMPLE_IMAGES = ["screenshot_phone.png", "receipt_photo.jpg", "camera_large.jpg"]
+CHANNEL_BUTTONS = [
+    {"label": "major", "dest_id": 1001, "mention_everyone": True, "role_id": "2001"},
+    {"label": "minor", "dest_id": 1002, "mention_everyone": False, "role_id": "2002"},
+    {"label": "member", "dest_id": 1003, "mention_everyone": False, "role_id": "2003"},
+    {"label": "food", "dest_id": 1004, "mention_everyone": False, "role_id": "2004"},
+]
+
+
+def percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return 0.0
+    k = max(0, min(len(sorted_vals) - 1, int(round(pct / 100.0 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[k]
+
+
+def summarize(samples_us, alloc_kib):
+    vals = sorted(samples_us)
+    return {
+        "n": len(vals),
+        "mean_us": sum(vals) / len(vals),
+        "p50_us": percentile(vals, 50),
+        "p90_us": percentile(vals, 90),
+        "p99_us": percentile(vals, 99),
+        "alloc_peak_kib": sum(alloc_kib) / len(alloc_kib) if alloc_kib else 0.0,
+    }
+
+
+def build_calls(eg, so, messages, corpus_message, watermark):
+    """stage -> list of zero-arg callables, one per corpus item."""
+    def cold_parse(m):
+        def call():
+            # Trees that memoize parse_extracted_text: empty the memo so every call parses
+            cache = getattr(eg, "_parse_cache", None)
+            if cache is not None:
+                cache.clear()
+            return eg.parse_extracted_text(m["text"], corpus_message(m))
+        return call
+
+    parsed = [eg.parse_extracted_text(m["text"], corpus_message(m)) for m in messages]
+    calls = {
+        "parse_extracted_text": [cold_parse(m) for m in messages],
+        "parse_extracted_text (cached)": [
+            (lambda m=m: eg.parse_extracted_text(m["text"], corpus_message(m))) for m in messages
+        ],
+        "enrich_promos": [
+            (lambda m=m: eg.enrich_promos({}, html.unescape(m["text"]), m["created_at"][:10])) for m in messages
+        ],
+        "embed_from_parsed": [
+            (lambda p=p: eg.embed_from_parsed(p, allow_edit=True, editor_user_ids={1},
+                                              channel_buttons=CHANNEL_BUTTONS,
+                                              channel_buttons_disable_after_send=True)) for p in parsed
+        ],
+        "create_multiple_image_embeds": [
+            (lambda p=p: eg.create_multiple_image_embeds(p, allow_edit=True, editor_user_ids={1},
+                                                         channel_buttons=CHANNEL_BUTTONS,
+                                                         channel_buttons_disable_after_send=True)) for p in parsed
+        ],
+    }
+    images = []
+    for name in SAMPLE_IMAGES:
+        with open(os.path.join(CORPUS_DIR, "images", name), "rb") as f:
+            images.append(f.read())
+    calls["add_image_watermark"] = [(lambda b=b: so.add_image_watermark(b, watermark)) for b in images]
+    return calls
+
+
+async def measure(calls, rounds, image_rounds):
+    results = {}
+    for stage in STAGES:
+        fns = calls[stage]
+        n = image_rounds if stage == "add_image_watermark" else rounds
+        for fn in fns:  # warm-up (imports, lazily built regexes/caches)
+            fn()
+        samples = []
+        for _ in range(n):
+            for fn in fns:
+                t0 = time.perf_counter()
+                fn()
+                samples.append((time.perf_counter() - t0) * 1e6)
+        allocs = []
+        tracemalloc.start()
+        for fn in fns:
+            tracemalloc.reset_peak()
+            start = tracemalloc.get_traced_memory()[0]
+            fn()
+            allocs.append((tracemalloc.get_traced_memory()[1] - start) / 1024.0)
+        tracemalloc.stop()
+        results[stage] = summarize(samples, allocs)
+    return results
+
+
+def check_golden(eg, messages, corpus_message):
+    with open(os.path.join(CORPUS_DIR, "expected_parse.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    failures = 0
+    for m in messages:
+        got = eg.parse_extracted_text(m["text"], corpus_message(m))
+        got = json.loads(json.dumps(dict(got.items()), ensure_ascii=False))
+        if got != expected[m["id"]]:
+            failures += 1
+            print(f"GOLDEN MISMATCH {m['id']}:\n  expected {expected[m['id']]}\n  got      {got}")
+    print(f"golden parse: {len(messages) - failures}/{len(messages)} match")
+    return failures
+
+
+def print_table(results):
+    print(f"{'stage':<32} {'n':>6} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'alloc KiB':>10}")
+    for stage in STAGES:
+        r = results.get(stage)
+        if r:
+            print(f"{stage:<32} {r['n']:>6} {r['p50_us']:>10.1f} {r['p90_us']:>10.1f} {r['p99_us']:>10.1f} "
+                  f"{r['alloc_peak_kib']:>10.1f}")
+
+
+def print_comparison(rev_a, res_a, rev_b, res_b):
+    print(f"{'stage':<32} {'p50 ' + rev_a:>14} {'p50 ' + rev_b:>14} {'change':>8}   "
+          f"{'p90 change':>10} {'alloc change':>12}")
+
+    def change(a, b):
+        return f"{(b - a) / a * 100:+.0f}%" if a else "n/a"
+
+    for stage in STAGES:
+        a, b = res_a.get(stage), res_b.get(stage)
+        if a and b:
+            print(f"{stage:<32} {a['p50_us']:>14.1f} {b['p50_us']:>14.1f} {change(a['p50_us'], b['p50_us']):>8}   "
+                  f"{change(a['p90_us'], b['p90_us']):>10} {change(a['alloc_peak_kib'], b['alloc_peak_kib']):>12}")
+
+
+def run_revision(rev, args):
+    """Benchmark a git revision in a scratch export; returns its results dict."""
+    with tempfile.TemporaryDirectory(prefix="fractored-bench-") as tmp:
+        tree = os.path.join(tmp, "tree")
+        os.makedirs(tree)
+        archive = subprocess.run(["git", "-C", REPO_ROOT, "archive", rev], check=True, capture_output=True).stdout
+        subprocess.run(["tar", "-x", "-C", tree], input=archive, check=True)
+        out = os.path.join(tmp, "results.json")
+        cmd = [sys.executable, os.path.abspath(__file__), "--tree", tree, "--json", out,
+               "--rounds", str(args.rounds), "--image-rounds", str(args.image_rounds), "--quiet"]
+        subprocess.run(cmd, check=True, cwd=tree)
+        with open(out, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rounds", type=int, default=20, help="passes over the message corpus per stage")
+    ap.add_argument("--image-rounds", type=int, default=3, help="passes over the sample images")
+    ap.add_argument("--check", action="store_true", help="verify parse output against the golden corpus")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", nargs=2, metavar=("REV_A", "REV_B"), help="benchmark two git revisions")
+    ap.add_argument("--tree", help=argparse.SUPPRESS)  # import the pipeline from this directory
+    ap.add_argument("--quiet", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.compare:
+        rev_a, rev_b = args.compare
+        res_a, res_b = run_revision(rev_a, args), run_revision(rev_b, args)
+        print_comparison(rev_a, res_a, rev_b, res_b)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({rev_a: res_a, rev_b: res_b}, f, indent=2)
+        return 0
+
+    if args.tree:
+        sys.path.insert(0, os.path.abspath(args.tree))
+    # Deal button state (newer trees) goes to a throwaway in-memory database
+    os.environ.setdefault("DEAL_STORE", ":memory:")
+
+    import embed_generator as eg
+    import success_overlay as so
+
+    with open(os.path.join(CORPUS_DIR, "messages.json"), encoding="utf-8") as f:
+        messages = json.load(f)
+
+    failures = check_golden(eg, messages, corpus_message) if args.check else 0
+    calls = build_calls(eg, so, messages, corpus_message, ensure_watermark())
+    results = asyncio.run(measure(calls, args.rounds, args.image_rounds))  # views need a running loop
+    if not args.quiet:
+        print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
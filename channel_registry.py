@@ -0,0 +1,68 @@
+# channel_registry.py
+# Resolves every configured channel ID once at startup so sends never wait on a REST lookup.
+
+import asyncio
+from typing import Dict, Optional
+
+import discord
+
+
+class ChannelUnavailable(Exception):
+    """Raised by warm() when configured channels can't be resolved."""
+
+
+class ChannelRegistry:
+    """Configured name -> channel, resolved up front and kept fresh from gateway events.
+
+    ``warm()`` (called from on_ready) looks up each ID through the client cache
+    and falls back to REST only there. After that ``get()`` is a dict lookup;
+    the bot forwards on_guild_channel_update/delete to ``update()``/``remove()``.
+    """
+
+    def __init__(self, client: discord.Client, channel_ids: Dict[str, int]):
+        self.client = client
+        self.channel_ids = dict(channel_ids)
+        self._channels: Dict[int, discord.abc.Messageable] = {}
+
+    async def _lookup(self, channel_id: int):
+        channel = self.client.get_channel(channel_id)
+        if channel is not None:
+            return channel
+        try:
+            return await self.client.fetch_channel(channel_id)
+        except (discord.HTTPException, discord.InvalidData) as e:
+            return e
+
+    async def warm(self) -> None:
+        """Resolve every configured ID; raises ChannelUnavailable listing the ones that failed."""
+        items = list(self.channel_ids.items())
+        resolved = await asyncio.gather(*(self._lookup(cid) for _, cid in items))
+        missing = []
+        for (name, cid), channel in zip(items, resolved):
+            if isinstance(channel, Exception):
+                missing.append(f"{name}={cid} ({channel})")
+            else:
+                self._channels[cid] = channel
+        if missing:
+            raise ChannelUnavailable("Unreachable channels: " + ", ".join(missing))
+
+    def get(self, channel_id: int) -> Optional[discord.abc.Messageable]:
+        """Channel for channel_id without any REST call (None if unknown/deleted)."""
+        return self._channels.get(channel_id) or self.client.get_channel(channel_id)
+
+    async def resolve(self, channel_id: int) -> Optional[discord.abc.Messageable]:
+        """get(), falling back to a REST fetch for IDs outside the registry."""
+        channel = self.get(channel_id) or await self._lookup(channel_id)
+        return None if isinstance(channel, Exception) else channel
+
+    def update(self, channel: discord.abc.GuildChannel) -> None:
+        if channel.id in self._channels:
+            self._channels[channel.id] = channel
+
+    def remove(self, channel: discord.abc.GuildChannel) -> None:
+        if self._channels.pop(channel.id, None) is not None:
+            names = [n for n, cid in self.channel_ids.items() if cid == channel.id]
+            print(f"WARNING: configured channel {', '.join(names)} ({channel.id}) was deleted")
+
+    def __len__(self) -> int:
+        return len(self._channels)
@@ -0,0 +1,39 @@
+# deal_store.py
+# On-disk state behind the deal buttons (see embed_generator.DealLinkView), loaded per click.
+
+import json
+import secrets
+import zlib
+from typing import Optional
+
+from ttl_store import TTLStore
+
+
+class DealStore(TTLStore):
+    """deal_id -> JSON-able state dict, zlib-compressed in SQLite.
+
+    Rows expire ``ttl_s`` seconds after their last write. The LRU (see
+    TTLStore) holds the compressed blobs, so a burst of clicks on one deal
+    doesn't hit the disk each time. get() always returns a fresh dict.
+    """
+
+    TABLE = "deals"
+    KEY_COLUMN = "deal_id"
+    KEY_TYPE = "TEXT"
+    VALUE_COLUMN = "state"
+    VALUE_TYPE = "BLOB"
+
+    def __init__(self, path: str, ttl_s: float = 30 * 86400, cache_size: int = 256, purge_every: int = 500):
+        super().__init__(path, ttl_s=ttl_s, cache_size=cache_size, purge_every=purge_every)
+
+    @staticmethod
+    def new_id() -> str:
+        # Short enough to leave room in a 100-char custom_id
+        return secrets.token_hex(8)
+
+    def get(self, deal_id: str) -> Optional[dict]:
+        blob = self._get(deal_id)
+        return None if blob is None else json.loads(zlib.decompress(blob))
+
+    def put(self, deal_id: str, state: dict) -> None:
+        self._put(deal_id, zlib.compress(json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode()))
@@ -0,0 +1,61 @@
+# delivery.py
+# Sends one rendered deal to several destinations at once, with per-destination timing and errors.
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+
+class Delivery(NamedTuple):
+    destination: str
+    ok: bool
+    elapsed_s: float
+    result: Any = None                    # whatever the send returned (usually the sent Message)
+    error: Optional[BaseException] = None
+
+
+class FanOutResult(NamedTuple):
+    deliveries: List[Delivery]
+    elapsed_s: float                      # wall time for the whole fan-out
+
+    @property
+    def ok(self) -> bool:
+        return all(d.ok for d in self.deliveries)
+
+    @property
+    def failed(self) -> List[Delivery]:
+        return [d for d in self.deliveries if not d.ok]
+
+    def get(self, destination: str) -> Optional[Delivery]:
+        for d in self.deliveries:
+            if d.destination == destination:
+                return d
+        return None
+
+    def summary(self) -> str:
+        parts = [
+            f"{d.destination} {d.elapsed_s * 1000:.0f}ms" + ("" if d.ok else f" FAILED ({d.error!r})")
+            for d in self.deliveries
+        ]
+        return f"fan-out {self.elapsed_s * 1000:.0f}ms: " + ", ".join(parts)
+
+
+async def _deliver(destination: str, send: Callable[[], Awaitable[Any]]) -> Delivery:
+    t0 = time.perf_counter()
+    try:
+        result = await send()
+    except Exception as e:
+        return Delivery(destination, False, time.perf_counter() - t0, error=e)
+    return Delivery(destination, True, time.perf_counter() - t0, result)
+
+
+async def fan_out(sends: Dict[str, Callable[[], Awaitable[Any]]]) -> FanOutResult:
+    """Run every send concurrently; one failing destination doesn't affect the others.
+
+    ``sends`` maps a destination label to a zero-argument coroutine function
+    (e.g. ``lambda: channel.send(...)``). Each send must build its own
+    discord.File objects, since a File can only be uploaded once.
+    """
+    t0 = time.perf_counter()
+    deliveries = await asyncio.gather(*(_deliver(name, send) for name, send in sends.items()))
+    return FanOutResult(list(deliveries), time.perf_counter() - t0)
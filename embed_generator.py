@@ -5,13 +5,25 @@
 import os
 import re
 import html
+import json
 import asyncio
+import hashlib
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
 from urllib.parse import unquote, urlparse
-from typing import Optional, Iterable, List, Dict, Any
+from typing import Optional, Iterable, Iterator, List, Dict, Any, Tuple, Union
 
 import discord
 from discord.ext import commands  # noqa: F401
 
+from deal_store import DealStore
+
 DISCORD_FIELD_LIMIT = 1024
 
 # ------------ Channel color map ------------
@@ -55,6 +67,25 @@ GLITCH_RE = re.compile(r"\b(glitch|price\s+glitched)\b", re.I)
 VCC_RE = re.compile(r"\bVCC\b", re.I)
 BIRTHDAY_RE = re.compile(r"\bbirthday\b", re.I)
 
+# Keyword gate for the promo regexes above. One lowercased copy of the text is
+# checked for these (C-speed substring scans) and only the signals whose
+# keyword shows up run their full regex. Each keyword is a literal substring
+# every match of its regex must contain, so skipping the rest is exact.
+PROMO_KEYWORDS = {
+    "code": ("code", "coupon"),
+    "today_only": ("today only",),
+    "thru": ("through", "thru"),
+    "while_supplies": ("while supplies last",),
+    "bogo": ("bogo", "buy"),
+    "free_wp": ("free",),
+    "glitch": ("glitch",),
+    "vcc": ("vcc",),
+    "birthday": ("birthday",),
+    "dyor": ("dyor",),
+}
+# Non-ASCII characters re.I treats as ASCII letters; str.lower() doesn't fold them
+_RE_I_ASCII_FOLDS = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s"})
+
 WAS_NOW_RE = re.compile(r"was[:\s]*\$\s*([\d\.xX]+).*?now[:\s]*\$\s*([\d\.xX]+)", re.I)
 DOLLAR_ANY_RE = re.compile(r"\$\s*[\d]+(?:\.[\dxX]{1,2})?")
 
@@ -72,11 +103,74 @@ DOMAIN_SELLERS = {
     "bit.ly": None,
 }
 
+# Hosts whose URLs are treated as images even without an image extension
+IMAGE_HOST_DOMAINS = [
+    "cdn.discordapp.com",
+    "media.discordapp.net",
+    "imgur.com",
+    "images.unsplash.com",
+    "picsum.photos",
+]
+
 MONTHS = {m: i for i, m in enumerate(
     ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug",
      "Sep", "Oct", "Nov", "Dec"], start=1)
 }
 
+# ------------ Domain lookup ------------
+
+class DomainSuffixIndex:
+    """Domain -> value table matched on whole-label suffixes of a host.
+
+    "smile.amazon.com" matches an "amazon.com" entry; "notamazon.com" does not.
+    A lookup tries the host's suffixes from longest to shortest, one dict probe
+    per label, so its cost doesn't grow with the size of the table.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Any]] = None):
+        self._entries: Dict[str, Any] = {}
+        for domain, value in (entries or {}).items():
+            self.add(domain, value)
+
+    def add(self, domain: str, value: Any = True) -> None:
+        self._entries[domain.lower().strip(".")] = value
+
+    def lookup(self, host: str) -> Tuple[bool, Any]:
+        """(found, value) for the most specific entry covering host."""
+        host = (host or "").lower().rstrip(".")
+        while host:
+            if host in self._entries:
+                return True, self._entries[host]
+            _, _, host = host.partition(".")
+        return False, None
+
+    def __contains__(self, host: str) -> bool:
+        return self.lookup(host)[0]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+SELLER_INDEX = DomainSuffixIndex(DOMAIN_SELLERS)
+IMAGE_HOST_INDEX = DomainSuffixIndex(dict.fromkeys(IMAGE_HOST_DOMAINS, True))
+
+
+def load_domain_tables(path: str) -> None:
+    """Merge a JSON file of {"sellers": {domain: name-or-null}, "image_hosts": [domain, ...]} into the indexes."""
+    with open(path, encoding="utf-8") as f:
+        tables = json.load(f)
+    for domain, name in (tables.get("sellers") or {}).items():
+        DOMAIN_SELLERS[domain] = name
+        SELLER_INDEX.add(domain, name)
+    for domain in tables.get("image_hosts") or []:
+        IMAGE_HOST_DOMAINS.append(domain)
+        IMAGE_HOST_INDEX.add(domain)
+
+
+if os.getenv("DOMAIN_TABLES"):
+    load_domain_tables(os.getenv("DOMAIN_TABLES"))
+
+
 # ------------ Utility helpers ------------
 
 async def wait_a_bit_for_embeds(message: discord.Message, delay: float) -> discord.Message:
@@ -87,6 +181,41 @@ async def wait_a_bit_for_embeds(message: discord.Message, delay: float) -> disco
         return message
 
 
+async def wait_for_embeds(
+    client: discord.Client,
+    message: discord.Message,
+    timeout: float = 2.0,
+    fallback_fetch: bool = True,
+) -> discord.Message:
+    """Return message once Discord has attached its link previews.
+
+    Previews arrive as a MESSAGE_UPDATE shortly after the message itself, so
+    this waits for that raw_message_edit event instead of sleeping a fixed
+    delay. If nothing arrives within timeout, the message is re-fetched once
+    (when fallback_fetch is set) in case the update was missed.
+    """
+    # Already unfurled (cached preview, or the edit landed and updated the cached message)
+    if message.embeds:
+        return message
+
+    def check(payload: discord.RawMessageUpdateEvent) -> bool:
+        return payload.message_id == message.id and bool(payload.data.get("embeds"))
+
+    try:
+        payload = await client.wait_for("raw_message_edit", check=check, timeout=timeout)
+    except asyncio.TimeoutError:
+        if message.embeds or not fallback_fetch:
+            return message
+    else:
+        updated = getattr(payload, "message", None)
+        if updated is not None:
+            return updated
+    try:
+        return await message.channel.fetch_message(message.id)
+    except Exception:
+        return message
+
+
 def first_embed_image_url(msg: discord.Message) -> Optional[str]:
     for emb in getattr(msg, "embeds", []) or []:
         if getattr(emb, "thumbnail", None):
@@ -124,16 +253,23 @@ def harvest_images_from_message(msg: discord.Message) -> list[str]:
                 imgs.append(part.url)
             elif part and getattr(part, "proxy_url", None):
                 imgs.append(part.proxy_url)
-    
+
+    return harvest_images(imgs, msg.content)
+
+
+def harvest_images(image_urls: Iterable[str], content: Optional[str]) -> list[str]:
+    """image_urls (attachments/embeds) plus any images in content, de-duplicated in order."""
+    imgs: list[str] = list(image_urls)
+
     # Get images from message content (markdown images and image URLs)
-    if msg.content:
+    if content:
         # Markdown images: ![alt](url)
-        md_images = MD_IMAGE_RE.findall(msg.content)
+        md_images = MD_IMAGE_RE.findall(content)
         for img_url in md_images:
             imgs.append(unquote(img_url))
         
         # Direct image URLs
-        all_urls = URL_RE.findall(msg.content)
+        all_urls = URL_RE.findall(content)
         for url in all_urls:
             url = unquote(url.rstrip(')'))
             if looks_like_image_url(url):
@@ -152,10 +288,7 @@ def looks_like_image_url(url: str) -> bool:
     """Check if a URL looks like an image URL"""
     try:
         bare_url = url.split("?", 1)[0].lower()
-        return (bare_url.endswith(IMG_EXTS) or 
-                "cdn.discordapp.com" in url or
-                "media.discordapp.net" in url or
-                any(domain in url.lower() for domain in ["imgur.com", "i.imgur.com", "images.unsplash.com", "picsum.photos"]))
+        return bare_url.endswith(IMG_EXTS) or urlparse(url).hostname in IMAGE_HOST_INDEX
     except:
         return False
 
@@ -188,33 +321,40 @@ def normalize_price_token(tok: str) -> str:
 def infer_seller_from_urls(urls: list[str]) -> Optional[str]:
     for u in urls:
         try:
-            host = urlparse(u).netloc.lower()
-            for dom, name in DOMAIN_SELLERS.items():
-                if host.endswith(dom):
-                    return name
+            found, name = SELLER_INDEX.lookup(urlparse(u).hostname)
+            if found:
+                return name
         except Exception:
             pass
     return None
 
 
+def scan_promo_signals(text: str) -> set:
+    """Names from PROMO_KEYWORDS whose keyword appears in text (case-insensitively)."""
+    s = text if text.isascii() else text.translate(_RE_I_ASCII_FOLDS)
+    s = s.lower()
+    return {name for name, keys in PROMO_KEYWORDS.items() if any(k in s for k in keys)}
+
+
 def enrich_promos(parsed: dict, text: str, message_date_iso: Optional[str] = None):
     t = text
     tags = set(parsed.get("tags", []))
     risk = set(parsed.get("risk", []))
     validity = parsed.get("validity", {}) or {}
+    hits = scan_promo_signals(t)
 
-    m = CODE_RE.search(t)
+    m = CODE_RE.search(t) if "code" in hits else None
     if m:
         parsed["code"] = m.group(1)
         tags.add("has-code")
 
-    if TODAY_ONLY_RE.search(t) and message_date_iso:
+    if "today_only" in hits and message_date_iso and TODAY_ONLY_RE.search(t):
         validity["type"] = "date"
         validity["end"] = message_date_iso
         tags.add("today-only")
 
-    m = THRU_RE.search(t)
-    if m and message_date_iso:
+    m = THRU_RE.search(t) if "thru" in hits and message_date_iso else None
+    if m:
         mon, day = m.group(1)[:3].title(), int(m.group(2))
         year = int(message_date_iso[:4])
         mon_num = MONTHS.get(mon, None)
@@ -222,22 +362,22 @@ def enrich_promos(parsed: dict, text: str, message_date_iso: Optional[str] = Non
             validity["type"] = "date"
             validity["end"] = f"{year:04d}-{mon_num:02d}-{day:02d}"
 
-    if WHILE_SUPPLIES_RE.search(t):
+    if "while_supplies" in hits and WHILE_SUPPLIES_RE.search(t):
         validity["disclaimer"] = "while-supplies-last"
 
-    if BOGO_RE.search(t):
+    if "bogo" in hits and BOGO_RE.search(t):
         tags.update(("promo", "bogo"))
-    if FREE_WP_RE.search(t):
+    if "free_wp" in hits and FREE_WP_RE.search(t):
         tags.update(("promo", "free-with-purchase"))
-    if GLITCH_RE.search(t):
+    if "glitch" in hits and GLITCH_RE.search(t):
         tags.update(("glitch", "YMMV"))
         risk.add("pricing-glitch")
-    if VCC_RE.search(t):
+    if "vcc" in hits and VCC_RE.search(t):
         tags.add("VCC-recommended")
         risk.add("payment-caution")
-    if BIRTHDAY_RE.search(t):
+    if "birthday" in hits and BIRTHDAY_RE.search(t):
         tags.update(("freebies", "birthday"))
-    if "DYOR" in t.upper():
+    if "dyor" in hits and "DYOR" in t.upper():
         tags.add("DYOR")
         risk.add("needs-research")
 
@@ -283,7 +423,36 @@ def pick_color_for(data: dict, category: Optional[str] = None) -> discord.Color:
             return CHANNEL_COLOR_MAP[tag]
     return discord.Color.blurple()
 
-# ----- Embed recolor helper for routing -----
+# ----- Embed recolor helpers for routing -----
+# Editors often route one deal to several channels. The recolored embed dicts
+# are built once per message version (key None); each color's embeds are then
+# made from those dicts with only "color" swapped, and kept for repeat sends.
+ROUTE_PAYLOAD_CACHE_SIZE = 256
+_route_payloads: "OrderedDict[tuple, Dict[Optional[int], list]]" = OrderedDict()
+
+
+def routed_embeds(message: discord.Message, color: discord.Color) -> List[discord.Embed]:
+    """recolor_embed() for every embed on message, cached per (message, edited_at, color).
+
+    The returned embeds are shared with the cache; send them as-is and
+    don't mutate them.
+    """
+    key = (message.id, message.edited_at)
+    entry = _route_payloads.get(key)
+    if entry is None:
+        entry = {None: [recolor_embed(e, color).to_dict() for e in message.embeds]}
+        _route_payloads[key] = entry
+        while len(_route_payloads) > ROUTE_PAYLOAD_CACHE_SIZE:
+            _route_payloads.popitem(last=False)
+    else:
+        _route_payloads.move_to_end(key)
+    embeds = entry.get(color.value)
+    if embeds is None:
+        embeds = [discord.Embed.from_dict({**d, "color": color.value}) for d in entry[None]]
+        entry[color.value] = embeds
+    return embeds
+
+
 def recolor_embed(src_embed: discord.Embed, color: discord.Color) -> discord.Embed:
     # Base embed
     e = discord.Embed(
@@ -323,17 +492,219 @@ def recolor_embed(src_embed: discord.Embed, color: discord.Color) -> discord.Emb
     return e
 
 
+# ------------ Parsed deal record ------------
+
+class ParsedDeal(MutableMapping):
+    """Result of parse_extracted_text.
+
+    Known fields live in __slots__ (an unset field is simply missing, like an
+    absent dict key); any other ``**Key**: value`` field from the post goes in
+    a small ``extra`` dict that is only created when needed. It behaves like
+    the plain dict parsing used to return, so ``data["price"]``, ``.get()``,
+    ``in`` and ``del`` all keep working, at a fraction of a dict's footprint
+    for every deal preview that stays alive in a view.
+    """
+
+    FIELDS = (
+        "raw_text", "title", "description", "links", "images", "thumbnail_url",
+        "url", "atc_url", "price", "old_price", "new_price", "discount",
+        "status", "stock", "sku", "seller", "promotion", "business_required",
+        "offer_id", "code", "tags", "risk", "validity", "quality",
+    )
+    __slots__ = FIELDS + ("extra",)
+    _FIELD_SET = frozenset(FIELDS)
+
+    raw_text: str
+    title: str
+    description: str
+    links: Dict[str, str]
+    images: List[str]
+    thumbnail_url: str
+    url: Optional[str]
+    atc_url: str
+    price: str
+    old_price: str
+    new_price: str
+    discount: str
+    status: str
+    stock: str
+    sku: str
+    seller: Optional[str]
+    promotion: str
+    business_required: str
+    offer_id: str
+    code: str
+    tags: List[str]
+    risk: List[str]
+    validity: Dict[str, str]
+    quality: str
+    extra: Optional[Dict[str, Any]]
+
+    def __init__(self, data=None, **fields):
+        self.extra = None
+        if data:
+            self.update(data)
+        if fields:
+            self.update(fields)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ParsedDeal":
+        """Build from a freshly parsed dict, setting slots directly (no per-key __setitem__)."""
+        out = cls.__new__(cls)
+        extra = None
+        for key, value in data.items():
+            if key in cls._FIELD_SET:
+                object.__setattr__(out, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        out.extra = extra
+        return out
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        else:
+            if self.extra is None:
+                raise KeyError(key)
+            del self.extra[key]
+            if not self.extra:
+                self.extra = None
+
+    def __contains__(self, key):
+        if key in self._FIELD_SET:
+            return hasattr(self, key)
+        return self.extra is not None and key in self.extra
+
+    def __iter__(self):
+        for name in self.FIELDS:
+            if hasattr(self, name):
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"ParsedDeal({self.to_dict()!r})"
+
+    def get(self, key, default=None):
+        if key in self._FIELD_SET:
+            return getattr(self, key, default)
+        return default if self.extra is None else self.extra.get(key, default)
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def copy(self) -> "ParsedDeal":
+        """Copy deep enough (one container level) that edits can't reach the original."""
+        return ParsedDeal.from_dict(_copy_parsed(self.to_dict()))
+
+
+def _copy_parsed(parsed: dict) -> dict:
+    return {k: (v.copy() if isinstance(v, (dict, list)) else v) for k, v in parsed.items()}
+
+
 # ------------ Core parse + embed build ------------
 
-def parse_extracted_text(raw_text: str, message: Optional[discord.Message] = None) -> dict:
+# Parse results are memoized: the same deal text shows up on several
+# forwarding channels at once and is re-parsed whenever a modal rebuilds it.
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "512"))
+_parse_cache: "OrderedDict[bytes, dict]" = OrderedDict()
+_parse_cache_lock = threading.Lock()
+_parse_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _message_date_iso(message: Optional[discord.Message]) -> Optional[str]:
+    if message and getattr(message, "created_at", None):
+        try:
+            return message.created_at.replace(tzinfo=None).isoformat()[:10]
+        except Exception:
+            return None
+    return None
+
+
+def _parse_cache_key(raw_text: str, message: Optional[discord.Message], msg_iso: Optional[str]) -> bytes:
+    """Digest of everything parse_extracted_text reads: text, image sources and the message date."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update((raw_text or "").encode("utf-8", "surrogatepass"))
+    parts = [msg_iso or ""]
+    if message:
+        for att in getattr(message, "attachments", []) or []:
+            parts.append(f"a:{getattr(att, 'url', '')}:{getattr(att, 'content_type', '')}")
+        for emb in getattr(message, "embeds", []) or []:
+            for part in (getattr(emb, "thumbnail", None), getattr(emb, "image", None)):
+                if part:
+                    parts.append(f"e:{getattr(part, 'url', '')}:{getattr(part, 'proxy_url', '')}")
+    h.update("\0".join(parts).encode("utf-8", "surrogatepass"))
+    return h.digest()
+
+
+def parse_cache_info() -> dict:
+    with _parse_cache_lock:
+        hits, misses = _parse_cache_stats["hits"], _parse_cache_stats["misses"]
+        return {
+            "hits": hits,
+            "misses": misses,
+            "size": len(_parse_cache),
+            "maxsize": PARSE_CACHE_SIZE,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+
+def parse_extracted_text(raw_text: str, message: Optional[discord.Message] = None) -> ParsedDeal:
+    """Parse a deal post. Memoized; every call returns a ParsedDeal the caller may modify."""
+    msg_iso = _message_date_iso(message) or os.getenv("MSG_DATE_ISO")
+    key = _parse_cache_key(raw_text, message, msg_iso)
+    with _parse_cache_lock:
+        cached = _parse_cache.get(key)
+        if cached is not None:
+            _parse_cache.move_to_end(key)
+            _parse_cache_stats["hits"] += 1
+        else:
+            _parse_cache_stats["misses"] += 1
+    if cached is not None:
+        return ParsedDeal.from_dict(_copy_parsed(cached))
+
+    images = harvest_images_from_message(message) if message else []
+    parsed = _parse_extracted_text(raw_text, images, msg_iso)
+    with _parse_cache_lock:
+        _parse_cache[key] = _copy_parsed(parsed)
+        while len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return ParsedDeal.from_dict(parsed)
+
+
+def _parse_extracted_text(raw_text: str, images: List[str], msg_iso: Optional[str]) -> dict:
     text = html.unescape(raw_text or "")
     parsed: dict = {"links": {}}
     parsed["raw_text"] = raw_text  # <-- Add this line
     lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
 
-    parsed["images"] = []
-    if message:
-        parsed["images"] = harvest_images_from_message(message)
+    parsed["images"] = images
 
     # Title detection
     title = None
@@ -426,16 +797,196 @@ def parse_extracted_text(raw_text: str, message: Optional[discord.Message] = Non
             parsed[b] = str(parsed[b]).strip().lower()
 
     add_prices(parsed, text)
-    msg_iso = None
-    if message and getattr(message, "created_at", None):
-        try:
-            msg_iso = message.created_at.replace(tzinfo=None).isoformat()[:10]
-        except Exception:
-            msg_iso = None
-    enrich_promos(parsed, text, message_date_iso=msg_iso or os.getenv("MSG_DATE_ISO"))
+    enrich_promos(parsed, text, message_date_iso=msg_iso)
     classify_quality(parsed, text)
     return parsed
 
+# ------------ Batch / backfill parsing ------------
+
+# (text, image_urls, created_at) -- created_at may be a datetime, an ISO string or None
+ParseRecord = Tuple[str, Iterable[str], Union[datetime, str, None]]
+
+
+class ParseStats:
+    """Running throughput numbers for parse_many; safe to read while it's being consumed."""
+
+    def __init__(self):
+        self.count = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return f"ParseStats(count={self.count}, elapsed={self.elapsed:.2f}s, per_second={self.per_second:.0f})"
+
+
+def _parse_record(record: ParseRecord) -> ParsedDeal:
+    text, image_urls, created_at = record
+    if isinstance(created_at, datetime):
+        msg_iso = created_at.replace(tzinfo=None).isoformat()[:10]
+    else:
+        msg_iso = (created_at or "")[:10] or None
+    images = harvest_images(image_urls or [], text)
+    return ParsedDeal.from_dict(_parse_extracted_text(text, images, msg_iso or os.getenv("MSG_DATE_ISO")))
+
+
+def _parse_chunk(records: List[ParseRecord]) -> List[ParsedDeal]:
+    return [_parse_record(r) for r in records]
+
+
+def parse_many(
+    records: Iterable[ParseRecord],
+    *,
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    stats: Optional[ParseStats] = None,
+) -> Iterator[ParsedDeal]:
+    """Parse many stored messages (e.g. a channel-history backfill), yielding results in input order.
+
+    Records are read lazily and parsed in chunks of ``chunk_size`` on a
+    process pool of ``workers`` processes (``workers=0`` parses in-process),
+    with only a couple of chunks per worker in flight. Pass a ParseStats to
+    watch messages/second while consuming. Bypasses the parse cache.
+    Workers come from a forkserver and re-import the calling script, so
+    scripts should call this under ``if __name__ == "__main__":``.
+    """
+    stats = stats if stats is not None else ParseStats()
+    stats.started = time.perf_counter()
+    it = iter(records)
+
+    def emit(results):
+        for parsed in results:
+            stats.count += 1
+            stats.elapsed = time.perf_counter() - stats.started
+            yield parsed
+
+    if workers == 0:
+        while chunk := list(islice(it, chunk_size)):
+            yield from emit(_parse_chunk(chunk))
+        return
+
+    workers = workers or os.cpu_count() or 1
+    # Not a fork of the caller, which may be the running bot (event loop,
+    # sockets, SQLite handles): workers start from a clean forkserver
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+    pending = deque()
+
+    def submit_next() -> bool:
+        chunk = list(islice(it, chunk_size))
+        if chunk:
+            pending.append(pool.submit(_parse_chunk, chunk))
+        return bool(chunk)
+
+    try:
+        for _ in range(2 * workers):
+            if not submit_next():
+                break
+        while pending:
+            results = pending.popleft().result()
+            submit_next()
+            yield from emit(results)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ------------ Footer logo ------------
+# Footers point at a hosted logo URL instead of re-uploading logo.png as an
+# attachment with every send. LOGO_URL can be set to a permanent URL; otherwise
+# publish_logo() uploads the file once and keeps the message so the (expiring)
+# signed CDN URL can be re-read later without uploading again. The message's
+# IDs are saved to LOGO_STATE so restarts re-use it instead of uploading a copy.
+LOGO_FILE = "logo.png"
+LOGO_STATE_PATH = os.getenv("LOGO_STATE", ".cache/logo.json")
+_logo_url: Optional[str] = os.getenv("LOGO_URL") or None
+_logo_message: Optional[discord.Message] = None
+
+
+def logo_url() -> Optional[str]:
+    return _logo_url
+
+
+def apply_footer(embed: discord.Embed, text: str = "Pricehub") -> discord.Embed:
+    """Set the branded footer; text-only until a logo URL is known."""
+    embed.set_footer(text=text, icon_url=_logo_url)
+    return embed
+
+
+def _load_logo_state(state_path: str) -> Optional[dict]:
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable logo state {state_path}: {e}")
+        return None
+
+
+def _save_logo_state(state_path: str, message: discord.Message) -> None:
+    directory = os.path.dirname(state_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{state_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"channel_id": message.channel.id, "message_id": message.id}, f)
+    os.replace(tmp, state_path)
+
+
+async def publish_logo(channel: discord.abc.Messageable, path: str = LOGO_FILE,
+                       state_path: Optional[str] = LOGO_STATE_PATH) -> Optional[str]:
+    """Upload the logo once (later calls refresh its signed CDN URL) and return the URL.
+
+    The upload is found again after a restart through state_path; a new one
+    is only posted when that message is gone (or was posted to another channel).
+    """
+    global _logo_url, _logo_message
+    target = _logo_message.channel if _logo_message is not None else channel
+    message_id = _logo_message.id if _logo_message is not None else None
+    if message_id is None and state_path:
+        state = _load_logo_state(state_path)
+        if state and state.get("channel_id") == channel.id:
+            message_id = state.get("message_id")
+    _logo_message = None
+    if message_id is not None:
+        try:
+            _logo_message = await target.fetch_message(message_id)
+        except (discord.NotFound, discord.Forbidden):
+            pass  # deleted (or unreadable): upload a new one
+    if _logo_message is None:
+        _logo_message = await channel.send(content="Footer logo (used by embeds; don't delete)",
+                                           file=discord.File(path, filename="logo.png"))
+        if state_path:
+            try:
+                _save_logo_state(state_path, _logo_message)
+            except OSError as e:
+                print(f"Could not save logo state: {e}")
+    if _logo_message.attachments:
+        _logo_url = _logo_message.attachments[0].url
+    return _logo_url
+
+
+# ------------ Deal state store ------------
+# Button state for sent deals lives on disk (see deal_store.py and DealLinkView).
+DEAL_STORE_PATH = os.getenv("DEAL_STORE", ".cache/deals.sqlite3")
+DEAL_STORE_TTL_DAYS = float(os.getenv("DEAL_STORE_TTL_DAYS", "30"))
+_deal_store: Optional[DealStore] = None
+
+
+def get_deal_store() -> DealStore:
+    global _deal_store
+    if _deal_store is None:
+        _deal_store = DealStore(DEAL_STORE_PATH, ttl_s=DEAL_STORE_TTL_DAYS * 86400)
+    return _deal_store
+
+
+def set_deal_store(store: DealStore) -> None:
+    global _deal_store
+    _deal_store = store
+
+
 # ------------ Embed + Buttons + Modals ------------
 
 def clamp(s: str, n: int = DISCORD_FIELD_LIMIT) -> str:
@@ -451,6 +1002,7 @@ class DealEditModal(discord.ui.Modal, title="Edit Deal"):
         editor_user_ids=None,
         channel_buttons=None,  # <-- Correct!
         channel_buttons_disable_after_send=False,
+        deal_id=None,
         *args, **kwargs
     ):
         super().__init__(*args, **kwargs)
@@ -459,6 +1011,7 @@ class DealEditModal(discord.ui.Modal, title="Edit Deal"):
         self.editor_user_ids = editor_user_ids
         self.channel_buttons = channel_buttons or []
         self.channel_buttons_disable_after_send = channel_buttons_disable_after_send
+        self.deal_id = deal_id
         # Add a field for description/message
         self.description = discord.ui.TextInput(
             label="Description",
@@ -480,8 +1033,10 @@ class DealEditModal(discord.ui.Modal, title="Edit Deal"):
             include_channel_buttons=True,
             channel_buttons=self.channel_buttons,
             channel_buttons_disable_after_send=self.channel_buttons_disable_after_send,
+            deal_id=self.deal_id,
         )
-        embed.set_footer(text="pricehub", icon_url="attachment://logo.png")
+        apply_footer(embed, "pricehub")
+        await view.save()
         await interaction.response.edit_message(embed=embed, view=view)
 
 class DealAdvancedModal(discord.ui.Modal, title="Advanced Edit"):
@@ -490,24 +1045,20 @@ class DealAdvancedModal(discord.ui.Modal, title="Advanced Edit"):
 
     def __init__(self, data: dict, category: Optional[str], editor_ids: Optional[Iterable[int]],
                  channel_buttons: Optional[List[Dict[str, Any]]] = None,
-                 channel_buttons_disable_after_send: bool = False):
+                 channel_buttons_disable_after_send: bool = False,
+                 deal_id: Optional[str] = None):
         super().__init__()
-        self.data = dict(data)
+        self.data = ParsedDeal(data)
         self.category = category
         self.editor_ids = set(editor_ids or [])
         self.channel_buttons = channel_buttons or []
         self.channel_buttons_disable_after_send = channel_buttons_disable_after_send
+        self.deal_id = deal_id
         self.seller_input.default = self.data.get("seller") or ""
         self.image_url_input.default = self.data.get("thumbnail_url") or (self.data.get("images") or [None])[0] or ""
 
     async def on_submit(self, interaction: discord.Interaction) -> None:
-        can_edit = False
-        if interaction.user:
-            if self.editor_ids and interaction.user.id in self.editor_ids:
-                can_edit = True
-            elif interaction.user.guild_permissions.manage_messages:
-                can_edit = True
-        if not can_edit:
+        if not _can_edit(interaction, self.editor_ids):
             await interaction.response.send_message("You don't have permission to edit this embed.", ephemeral=True)
             return
 
@@ -535,28 +1086,64 @@ class DealAdvancedModal(discord.ui.Modal, title="Advanced Edit"):
             include_channel_buttons=True,
             channel_buttons=self.channel_buttons,
             channel_buttons_disable_after_send=self.channel_buttons_disable_after_send,
+            deal_id=self.deal_id,
         )
-        file = discord.File("logo.png", filename="logo.png")
-        embed.set_footer(text="pricehub", icon_url="attachment://logo.png")
+        apply_footer(embed, "pricehub")
+        await view.save()
         await interaction.response.edit_message(embed=embed, view=view)
 
 
 
+def _can_edit(interaction: discord.Interaction, editor_ids: Iterable[int]) -> bool:
+    if interaction.user:
+        if editor_ids and interaction.user.id in editor_ids:
+            return True
+        if interaction.user.guild_permissions.manage_messages:
+            return True
+    return False
+
+
+async def _load_deal(interaction: discord.Interaction, deal_id: str) -> Optional[dict]:
+    """Stored button state for deal_id; tells the user (ephemerally) if it has expired."""
+    # SQLite read, decompress and JSON decode stay off the event loop
+    state = await asyncio.to_thread(get_deal_store().get, deal_id)
+    if state is None:
+        text = "This deal has expired and can no longer be edited or routed."
+        if interaction.response.is_done():
+            await interaction.followup.send(text, ephemeral=True)
+        else:
+            await interaction.response.send_message(text, ephemeral=True)
+    return state
+
+
 class DealLinkView(discord.ui.View):
-    """Composite View: link buttons + optional Edit/Advanced + optional channel routing buttons."""
+    """Composite View: link buttons + optional Edit/Advanced + optional channel routing buttons.
+
+    Edit/Advanced/routing buttons are DynamicItems whose custom_id carries a
+    deal ID. The data they need is written to the deal store by save(), which
+    callers await before sending the view, and read back on click, so a sent
+    view holds nothing in memory and its buttons keep working after a restart
+    (the bot registers DYNAMIC_ITEMS at startup). Views that are never sent
+    never touch the store.
+    """
     def __init__(self, links: Optional[dict], data: dict,
                  category: Optional[str] = None,
                  allow_edit: bool = False,
                  editor_user_ids: Optional[Iterable[int]] = None,
                  channel_buttons: Optional[List[Dict[str, Any]]] = None,
                  channel_buttons_disable_after_send: bool = False,
-                 timeout: Optional[float] = None):
+                 timeout: Optional[float] = None,
+                 deal_id: Optional[str] = None,
+                 routes_disabled: bool = False):
         super().__init__(timeout=timeout)
         self.data = data
+        self.links = links or {}
         self.category = category
+        self.allow_edit = allow_edit
         self.editor_user_ids = set(editor_user_ids or [])
         self.channel_buttons = channel_buttons or []
         self.channel_buttons_disable_after_send = channel_buttons_disable_after_send
+        self.deal_id = deal_id or DealStore.new_id()
 
         order = ["ATC", "KEEPA", "SAS", "EBAY", "GOOGLE", "CHECK STOCK", "WALMART", "TARGET", "BESTBUY"]
         added = 0
@@ -586,121 +1173,184 @@ class DealLinkView(discord.ui.View):
 
         # Edit / Advanced
         if allow_edit:
-            self.add_item(self.EditButton(self))
-            self.add_item(self.AdvancedButton(self))
+            self.add_item(self.EditButton(self.deal_id))
+            self.add_item(self.AdvancedButton(self.deal_id))
 
         # Channel routing buttons
-        for cfg in self.channel_buttons:
+        for index, cfg in enumerate(self.channel_buttons):
             label = str(cfg.get("label", "send"))[:80]
-            dest_id = int(cfg["dest_id"])
-            mention_everyone = bool(cfg.get("mention_everyone", False))
-            role_id = cfg.get("role_id")
-            self.add_item(self.RouteButton(self, label, dest_id, mention_everyone, role_id))
+            self.add_item(self.RouteButton(self.deal_id, index, label, disabled=routes_disabled))
+
+    @classmethod
+    def from_state(cls, deal_id: str, state: dict, routes_disabled: bool = False) -> "DealLinkView":
+        """Rebuild the view for a stored deal (without writing it back)."""
+        return cls(
+            links=state.get("links"),
+            data=ParsedDeal(state["data"]),
+            category=state.get("category"),
+            allow_edit=state.get("allow_edit", False),
+            editor_user_ids=state.get("editor_user_ids"),
+            channel_buttons=state.get("channel_buttons"),
+            channel_buttons_disable_after_send=state.get("disable_after_send", False),
+            deal_id=deal_id,
+            routes_disabled=routes_disabled,
+        )
 
-    class EditButton(discord.ui.Button):
-        def __init__(self, parent_view: "DealLinkView"):
-            super().__init__(label="Edit", style=discord.ButtonStyle.primary)
-            self.parent_view = parent_view
+    def to_state(self) -> dict:
+        """What the Edit/Advanced/routing buttons need to act on this deal later."""
+        return {
+            "data": ParsedDeal(self.data).copy().to_dict(),
+            "links": dict(self.links),
+            "category": self.category,
+            "allow_edit": self.allow_edit,
+            "editor_user_ids": sorted(self.editor_user_ids),
+            "channel_buttons": self.channel_buttons,
+            "disable_after_send": self.channel_buttons_disable_after_send,
+        }
+
+    async def save(self) -> None:
+        """Write this deal's button state to the store (in a thread); await before sending the view.
+
+        Drops the view's copy of the deal afterwards: the buttons read it back
+        from the store, so a sent view (which discord.py keeps alive) holds no
+        per-deal text and raw_text is stored once, in the deal's store row.
+        """
+        if self.allow_edit or self.channel_buttons:
+            await asyncio.to_thread(get_deal_store().put, self.deal_id, self.to_state())
+        self.data = None
+
+    class EditButton(discord.ui.DynamicItem[discord.ui.Button], template=r"deal:edit:(?P<deal_id>[0-9a-f]+)"):
+        def __init__(self, deal_id: str):
+            super().__init__(discord.ui.Button(label="Edit", style=discord.ButtonStyle.primary,
+                                               custom_id=f"deal:edit:{deal_id}"))
+            self.deal_id = deal_id
+
+        @classmethod
+        async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+            return cls(match["deal_id"])
 
         async def callback(self, interaction: discord.Interaction):
-            user_ok = False
-            if interaction.user:
-                if self.parent_view.editor_user_ids and interaction.user.id in self.parent_view.editor_user_ids:
-                    user_ok = True
-                elif interaction.user.guild_permissions.manage_messages:
-                    user_ok = True
-            if not user_ok:
+            state = await _load_deal(interaction, self.deal_id)
+            if state is None:
+                return
+            if not _can_edit(interaction, state["editor_user_ids"]):
                 await interaction.response.send_message("You don't have permission to edit this embed.", ephemeral=True)
                 return
             modal = DealEditModal(
-                self.parent_view.data,
-                self.parent_view.category,
-                self.parent_view.editor_user_ids,
-                channel_buttons=self.parent_view.channel_buttons,
-                channel_buttons_disable_after_send=self.parent_view.channel_buttons_disable_after_send
+                ParsedDeal(state["data"]),
+                state["category"],
+                set(state["editor_user_ids"]),
+                channel_buttons=state["channel_buttons"],
+                channel_buttons_disable_after_send=state["disable_after_send"],
+                deal_id=self.deal_id,
             )
             await interaction.response.send_modal(modal)
 
-    class AdvancedButton(discord.ui.Button):
-        def __init__(self, parent_view: "DealLinkView"):
-            super().__init__(label="Advanced", style=discord.ButtonStyle.secondary)
-            self.parent_view = parent_view
+    class AdvancedButton(discord.ui.DynamicItem[discord.ui.Button], template=r"deal:adv:(?P<deal_id>[0-9a-f]+)"):
+        def __init__(self, deal_id: str):
+            super().__init__(discord.ui.Button(label="Advanced", style=discord.ButtonStyle.secondary,
+                                               custom_id=f"deal:adv:{deal_id}"))
+            self.deal_id = deal_id
+
+        @classmethod
+        async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+            return cls(match["deal_id"])
 
         async def callback(self, interaction: discord.Interaction):
-            user_ok = False
-            if interaction.user:
-                if self.parent_view.editor_user_ids and interaction.user.id in self.parent_view.editor_user_ids:
-                    user_ok = True
-                elif interaction.user.guild_permissions.manage_messages:
-                    user_ok = True
-            if not user_ok:
+            state = await _load_deal(interaction, self.deal_id)
+            if state is None:
+                return
+            if not _can_edit(interaction, state["editor_user_ids"]):
                 await interaction.response.send_message("You don't have permission to edit this embed.", ephemeral=True)
                 return
             modal = DealAdvancedModal(
-                self.parent_view.data,
-                self.parent_view.category,
-                self.parent_view.editor_user_ids,
-                channel_buttons=self.parent_view.channel_buttons,
-                channel_buttons_disable_after_send=self.parent_view.channel_buttons_disable_after_send
+                ParsedDeal(state["data"]),
+                state["category"],
+                state["editor_user_ids"],
+                channel_buttons=state["channel_buttons"],
+                channel_buttons_disable_after_send=state["disable_after_send"],
+                deal_id=self.deal_id,
             )
             await interaction.response.send_modal(modal)
 
-    class RouteButton(discord.ui.Button):
-        def __init__(self, parent_view: "DealLinkView", label: str, dest_id: int, mention_everyone: bool, role_id: str = None):
-            super().__init__(label=label, style=discord.ButtonStyle.success)
-            self.parent_view = parent_view
-            self.dest_id = dest_id
-            self.mention_everyone = mention_everyone
-            self.role_id = role_id
-            self.label_lower = label.lower()
+    class RouteButton(discord.ui.DynamicItem[discord.ui.Button],
+                      template=r"deal:route:(?P<deal_id>[0-9a-f]+):(?P<index>[0-9]+)"):
+        def __init__(self, deal_id: str, index: int, label: str = "send", disabled: bool = False):
+            super().__init__(discord.ui.Button(label=label, style=discord.ButtonStyle.success, disabled=disabled,
+                                               custom_id=f"deal:route:{deal_id}:{index}"))
+            self.deal_id = deal_id
+            self.index = index
+
+        @classmethod
+        async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+            return cls(match["deal_id"], int(match["index"]), item.label or "send", item.disabled)
 
         async def callback(self, interaction: discord.Interaction):
             await interaction.response.defer(ephemeral=True)
-            # Use interaction.client as the Bot
+            state = await _load_deal(interaction, self.deal_id)
+            if state is None:
+                return
+            if self.index >= len(state["channel_buttons"]):
+                await interaction.followup.send("This routing button is no longer configured.", ephemeral=True)
+                return
+            cfg = state["channel_buttons"][self.index]
+            label = str(cfg.get("label", "send"))[:80]
+            dest_id = int(cfg["dest_id"])
+            mention_everyone = bool(cfg.get("mention_everyone", False))
+            role_id = cfg.get("role_id")
+            label_lower = label.lower()
+
+            # Use interaction.client as the Bot; prefer its pre-resolved channel registry
             bot = interaction.client
-            dest = bot.get_channel(self.dest_id) or await bot.fetch_channel(self.dest_id)
+            registry = getattr(bot, "channel_registry", None)
+            if registry is not None:
+                dest = await registry.resolve(dest_id)
+            else:
+                dest = bot.get_channel(dest_id) or await bot.fetch_channel(dest_id)
             if not dest:
-                await interaction.followup.send(f"{self.label} channel not found.", ephemeral=True)
+                await interaction.followup.send(f"{label} channel not found.", ephemeral=True)
                 return
 
             # Build content with mentions
             content_parts = []
-            if self.mention_everyone:
+            if mention_everyone:
                 content_parts.append("@everyone")
-            if self.role_id:
-                content_parts.append(f"<@&{self.role_id}>")
+            if role_id:
+                content_parts.append(f"<@&{role_id}>")
             
             content = " ".join(content_parts) if content_parts else None
             
-            # Handle multiple embeds (quadrant layout)
-            if len(interaction.message.embeds) > 1:
-                # Recolor all embeds
-                recolored_embeds = []
-                color = CHANNEL_COLOR_MAP.get(self.label_lower, discord.Color.blurple())
-                for embed in interaction.message.embeds:
-                    recolored_embeds.append(recolor_embed(embed, color))
+            # Recolored copies of the message's embeds (cached per message version)
+            color = CHANNEL_COLOR_MAP.get(label_lower, discord.Color.blurple())
+            recolored_embeds = routed_embeds(interaction.message, color)
+            webhooks = getattr(bot, "webhook_sender", None)
+            t0 = time.perf_counter()
+            if cfg.get("webhook") and webhooks is not None and recolored_embeds:
+                await webhooks.send_or_fallback(dest, content=content, embeds=recolored_embeds)
+            elif len(recolored_embeds) > 1:
+                # Multiple embeds (quadrant layout)
                 await dest.send(content=content, embeds=recolored_embeds)
+            elif recolored_embeds:
+                await dest.send(content=content, embed=recolored_embeds[0])
             else:
-                # Single embed (fallback)
-                color = CHANNEL_COLOR_MAP.get(self.label_lower, discord.Color.blurple())
-                e = recolor_embed(interaction.message.embeds[0], color) if interaction.message.embeds else None
-                if e:
-                    await dest.send(content=content, embed=e)
-                else:
-                    await dest.send(content=content or "Forwarded message")
+                await dest.send(content=content or "Forwarded message")
+            print(f"Routed deal {self.deal_id} to {label}"
+                  f"{' via webhook' if cfg.get('webhook') else ''} in {(time.perf_counter() - t0) * 1000:.0f}ms")
 
             # Optionally disable routing buttons after send
-            if self.parent_view.channel_buttons_disable_after_send:
-                for item in self.parent_view.children:
-                    if isinstance(item, discord.ui.Button) and isinstance(item, self.__class__):
-                        item.disabled = True
+            if state["disable_after_send"]:
+                view = DealLinkView.from_state(self.deal_id, state, routes_disabled=True)
                 try:
-                    await interaction.message.edit(view=self.parent_view)
+                    await interaction.message.edit(view=view)
                 except Exception:
                     pass
 
-            await interaction.followup.send(f"Sent to {self.label}.", ephemeral=True)
+            await interaction.followup.send(f"Sent to {label}.", ephemeral=True)
+
 
+# Register these once with bot.add_dynamic_items(*DYNAMIC_ITEMS) so clicks on
+# any deal message (including ones sent before a restart) are dispatched.
+DYNAMIC_ITEMS = (DealLinkView.EditButton, DealLinkView.AdvancedButton, DealLinkView.RouteButton)
 
 
 def embed_from_parsed(
@@ -712,6 +1362,7 @@ def embed_from_parsed(
     include_channel_buttons: bool = True,
     channel_buttons: Optional[List[Dict[str, Any]]] = None,
     channel_buttons_disable_after_send: bool = False,
+    deal_id: Optional[str] = None,
 ) -> tuple[discord.Embed, Optional[discord.ui.View]]:
     color = pick_color_for(data, category)
     embed = discord.Embed(
@@ -767,6 +1418,7 @@ def embed_from_parsed(
         channel_buttons=(channel_buttons or []) if include_channel_buttons else [],
         channel_buttons_disable_after_send=channel_buttons_disable_after_send,
         timeout=None,
+        deal_id=deal_id,
     )
     return embed, view
 
@@ -780,6 +1432,7 @@ def create_multiple_image_embeds(
     include_channel_buttons: bool = True,
     channel_buttons: Optional[List[Dict[str, Any]]] = None,
     channel_buttons_disable_after_send: bool = False,
+    deal_id: Optional[str] = None,
 ) -> tuple[List[discord.Embed], Optional[discord.ui.View]]:
     """Create multiple embeds for multiple images in a grid-like layout"""
     images = data.get("images", [])
@@ -788,7 +1441,8 @@ def create_multiple_image_embeds(
         embed, view = embed_from_parsed(
             data, category=category, allow_edit=allow_edit,
             editor_user_ids=editor_user_ids, include_channel_buttons=include_channel_buttons,
-            channel_buttons=channel_buttons, channel_buttons_disable_after_send=channel_buttons_disable_after_send
+            channel_buttons=channel_buttons, channel_buttons_disable_after_send=channel_buttons_disable_after_send,
+            deal_id=deal_id,
         )
         return [embed], view
     
@@ -836,6 +1490,7 @@ def create_multiple_image_embeds(
         channel_buttons=(channel_buttons or []) if include_channel_buttons else [],
         channel_buttons_disable_after_send=channel_buttons_disable_after_send,
         timeout=None,
+        deal_id=deal_id,
     )
     
     return embeds, view
@@ -857,4 +1512,5 @@ async def handle_message_example(message: discord.Message, *, category: Optional
         allow_edit=allow_edit,
         editor_user_ids=editor_user_ids
     )
+    await view.save()
     await message.channel.send(embed=embed, view=view)
@@ -0,0 +1,162 @@
+# intake.py
+# Bounded work queue for incoming deal messages, with per-key ordering for their sends.
+
+import asyncio
+import time
+import traceback
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class IntakeFull(Exception):
+    """Raised by submit(wait=False) when the queue is full."""
+
+
+class Turn:
+    """An item's place in line among the items submitted with the same key.
+
+    ``async with turn:`` waits until every earlier item with that key has
+    finished its turn (or finished without taking one), so only the code
+    inside the block is serialized per key.
+    """
+
+    def __init__(self, intake: "IntakeQueue", key: Hashable, prev: Optional[asyncio.Future]):
+        self._intake = intake
+        self._key = key
+        self._prev = prev
+        self._done = asyncio.get_running_loop().create_future()
+        self._released = False
+        self.wait_s = 0.0  # time spent waiting for earlier items
+
+    async def __aenter__(self) -> "Turn":
+        if self._prev is not None and not self._prev.done():
+            t0 = time.perf_counter()
+            await asyncio.shield(self._prev)
+            self.wait_s = time.perf_counter() - t0
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+    def release(self) -> None:
+        """Let the next item with this key go once every earlier one has; idempotent."""
+        if self._released:
+            return
+        self._released = True
+        if self._prev is None or self._prev.done():
+            self._finish()
+        else:
+            # Skipped or failed before its turn came: keep the line intact
+            self._prev.add_done_callback(lambda _: self._finish())
+
+    def _finish(self) -> None:
+        if not self._done.done():
+            self._done.set_result(None)
+        if self._intake._tails.get(self._key) is self._done:
+            del self._intake._tails[self._key]
+
+
+class IntakeQueue:
+    """Feeds items to ``handler(item, turn)`` on a fixed pool of workers.
+
+    All workers share one bounded queue, so items are handled concurrently
+    whatever their key; the handler does its ordered part (the sends) inside
+    ``async with turn:``, which runs in submission order per ``key``. A turn
+    the handler never takes is released when it returns or fails.
+    ``submit()`` blocks while the queue is full (backpressure), or raises
+    IntakeFull with ``wait=False``. Handler exceptions are logged and don't
+    stop the worker.
+    """
+
+    def __init__(self, handler: Callable[[Any, Turn], Awaitable[None]], workers: int = 16,
+                 queue_size: int = 100, history: int = 100):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._tails: Dict[Hashable, asyncio.Future] = {}  # key -> last submitted item's done future
+        self._recent = deque(maxlen=history)  # (wait_s, handle_s, turn_wait_s)
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.running = 0
+        self.max_wait_s = 0.0
+
+    def _start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def _work(self) -> None:
+        while True:
+            item, turn, enqueued_at = await self._queue.get()
+            wait_s = time.perf_counter() - enqueued_at
+            self.max_wait_s = max(self.max_wait_s, wait_s)
+            self.running += 1
+            t0 = time.perf_counter()
+            try:
+                await self.handler(item, turn)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                traceback.print_exc()
+            finally:
+                turn.release()
+                self.running -= 1
+                self._recent.append((wait_s, time.perf_counter() - t0, turn.wait_s))
+                self._queue.task_done()
+
+    async def submit(self, key: Hashable, item: Any, *, wait: bool = True) -> None:
+        if self._queue is None:
+            self._start()
+        # Take the place in line now, so ordering follows arrival
+        turn = Turn(self, key, self._tails.get(key))
+        self._tails[key] = turn._done
+        job = (item, turn, time.perf_counter())
+        try:
+            if wait:
+                await self._queue.put(job)
+            else:
+                try:
+                    self._queue.put_nowait(job)
+                except asyncio.QueueFull:
+                    self.rejected += 1
+                    raise IntakeFull(f"intake queue full ({self.queue_size} items waiting)") from None
+        except BaseException:
+            turn.release()
+            raise
+        self.submitted += 1
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def stats(self) -> dict:
+        recent = list(self._recent)
+        n = len(recent) or 1
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "queue_size": self.queue_size,
+            "running": self.running,
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_s": sum(r[0] for r in recent) / n,
+            "max_wait_s": self.max_wait_s,
+            "avg_handle_s": sum(r[1] for r in recent) / n,
+            "avg_turn_wait_s": sum(r[2] for r in recent) / n,
+        }
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """Wait until everything queued so far has been handled."""
+        if self._queue is not None:
+            await asyncio.wait_for(self._queue.join(), timeout)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._queue = None
@@ -0,0 +1,534 @@
+# mirror_bot.py
+# The bot: configuration, event handlers and main(). Started by fractored-mirror-bot.py.
+# Importing this module only reads the environment; main() builds the bot, stores and pools.
+
+import discord
+import embed_generator
+import success_overlay
+import watermark_engine
+import watermark_cache
+import preview_timing
+import delivery
+import channel_registry
+import intake
+import ownership_store
+import webhook_delivery
+import os
+import io
+import asyncio
+from discord.ext import commands
+from discord.ui import Button, View
+from uuid import uuid4
+# from deal_bot import client, TOKEN
+
+import success_overlay
+
+
+BOT_TOKEN = os.getenv("DISCORD_TOKEN")
+####################################################
+# MAIN SERVER (Original Channel Buttons)
+TARGET_CHANNEL_ID = int(os.getenv("TARGET"))
+MAJOR_ID = int(os.getenv("MAJOR"))
+MINOR_ID = int(os.getenv("MINOR"))
+MEMBER_ID = int(os.getenv("MEMBER"))
+FOOD_ID = int(os.getenv("FOOD"))
+SUCCESS_ID = int(os.getenv("SUCCESS"))
+
+# NEW FLIP CHANNELS
+ONLINE_FLIPS_ID = int(os.getenv("ONLINE_FLIPS_ID"))
+SEASONAL_FLIPS_ID = int(os.getenv("SEASONAL_FLIPS_ID"))
+TARGET_FLIPS_ID = int(os.getenv("TARGET_FLIPS_ID"))
+THRIFT_FLIPS_ID = int(os.getenv("THRIFT_FLIPS_ID"))
+WALMART_FLIPS_ID = int(os.getenv("WALMART_FLIPS_ID"))
+FLIGHT_DEALS_ID = int(os.getenv("FLIGHT_DEALS_ID"))
+CHIPOTLE_ID = int(os.getenv("CHIPOTLE_ID"))
+FOOD_ANNOUNCEMENT_ID = int(os.getenv("FOOD_ANNOUNCEMENT_ID"))
+
+###################################################
+# FORWARDING SERVER (Original)
+MAJOR_FID = int(os.getenv("F_MAJOR"))
+MINOR_FID = int(os.getenv("F_MINOR"))
+MEMBER_FID = int(os.getenv("F_MEMBER"))
+DEALS_FID = int(os.getenv("F_DEALS"))
+FOOD_FID = int(os.getenv("F_FOOD"))
+CHIPOTLE_FID = int(os.getenv("F_CHIPOTLE"))
+TEST_CHANNEL = int(os.getenv("TEST_CHANNEL"))
+
+# NEW FORWARDING SERVER CHANNELS
+ONLINE_FLIPS_FID = int(os.getenv("ONLINE_FLIPS_FID"))
+TARGET_FLIPS_FID = int(os.getenv("TARGET_FLIPS_FID"))
+WALMART_FLIPS_FID = int(os.getenv("WALMART_FLIPS_FID"))
+SEASONAL_FLIPS_FID = int(os.getenv("SEASONAL_FLIPS_FID"))
+THRIFT_FLIPS_FID = int(os.getenv("THRIFT_FLIPS_FID"))
+FLIGHT_FLIPS_FID = int(os.getenv("FLIGHT_FLIPS_FID"))
+SMALL_PRICE_ERRORS_FID = int(os.getenv("SMALL_PRICE_ERRORS_FID"))
+CHIPOTLE_FID = int(os.getenv("CHIPOTLE_FID"))
+FOOD_FID = int(os.getenv("FOOD_FID"))
+
+# Original source channels (for channel buttons)
+ORIGINAL_SOURCE_CHANNEL_IDS = {MAJOR_FID, MINOR_FID, MEMBER_FID, DEALS_FID, FOOD_FID, CHIPOTLE_FID}
+
+# Direct mapping from forwarding to main server (for new flip channels)
+FORWARDING_TO_MAIN_MAP = {
+    ONLINE_FLIPS_FID: ONLINE_FLIPS_ID,
+    TARGET_FLIPS_FID: TARGET_FLIPS_ID,
+    WALMART_FLIPS_FID: WALMART_FLIPS_ID,
+    SEASONAL_FLIPS_FID: SEASONAL_FLIPS_ID,
+    THRIFT_FLIPS_FID: THRIFT_FLIPS_ID,
+    FLIGHT_FLIPS_FID: FLIGHT_DEALS_ID,  # Map to flight deals
+    SMALL_PRICE_ERRORS_FID: ONLINE_FLIPS_ID,  # Map to online flips
+    CHIPOTLE_FID: CHIPOTLE_ID,  # Map to chipotle
+    FOOD_FID: FOOD_ANNOUNCEMENT_ID,  # Map to food announcements
+}
+
+# Combined source channels (both original and new)
+SOURCE_CHANNEL_IDS = ORIGINAL_SOURCE_CHANNEL_IDS.union(set(FORWARDING_TO_MAIN_MAP.keys()))
+
+intents = discord.Intents.default()
+intents.message_content = True
+intents.guilds = True
+intents.messages = True
+intents.reactions = True
+
+class MirrorBot(commands.Bot):
+    async def close(self):
+        # Disconnect first, then release the worker pools and the webhook HTTP session
+        # and write out preview timings recorded since the last periodic save
+        await super().close()
+        await intake_queue.close()
+        await wm_engine.close()
+        await webhooks.close()
+        preview_timings.flush()
+
+
+# Every channel ID from the environment, resolved once in on_ready (see channel_registry.py)
+CONFIGURED_CHANNELS = {
+    "TARGET": TARGET_CHANNEL_ID, "MAJOR": MAJOR_ID, "MINOR": MINOR_ID, "MEMBER": MEMBER_ID,
+    "FOOD": FOOD_ID, "SUCCESS": SUCCESS_ID, "TEST_CHANNEL": TEST_CHANNEL,
+    "ONLINE_FLIPS_ID": ONLINE_FLIPS_ID, "SEASONAL_FLIPS_ID": SEASONAL_FLIPS_ID,
+    "TARGET_FLIPS_ID": TARGET_FLIPS_ID, "THRIFT_FLIPS_ID": THRIFT_FLIPS_ID,
+    "WALMART_FLIPS_ID": WALMART_FLIPS_ID, "FLIGHT_DEALS_ID": FLIGHT_DEALS_ID,
+    "CHIPOTLE_ID": CHIPOTLE_ID, "FOOD_ANNOUNCEMENT_ID": FOOD_ANNOUNCEMENT_ID,
+    "F_MAJOR": MAJOR_FID, "F_MINOR": MINOR_FID, "F_MEMBER": MEMBER_FID, "F_DEALS": DEALS_FID,
+    "ONLINE_FLIPS_FID": ONLINE_FLIPS_FID, "TARGET_FLIPS_FID": TARGET_FLIPS_FID,
+    "WALMART_FLIPS_FID": WALMART_FLIPS_FID, "SEASONAL_FLIPS_FID": SEASONAL_FLIPS_FID,
+    "THRIFT_FLIPS_FID": THRIFT_FLIPS_FID, "FLIGHT_FLIPS_FID": FLIGHT_FLIPS_FID,
+    "SMALL_PRICE_ERRORS_FID": SMALL_PRICE_ERRORS_FID, "CHIPOTLE_FID": CHIPOTLE_FID, "FOOD_FID": FOOD_FID,
+}
+
+# Who may 🗑️ each watermarked post; survives restarts and expires after OWNERSHIP_TTL_DAYS
+OWNERSHIP_DB = os.getenv("OWNERSHIP_DB", ".cache/ownership.sqlite3")
+OWNERSHIP_TTL_DAYS = float(os.getenv("OWNERSHIP_TTL_DAYS", "30"))
+
+# Success-channel watermarking runs in worker processes (see watermark_engine.py)
+WATERMARK_WORKERS = int(os.getenv("WATERMARK_WORKERS", "2"))
+WATERMARK_QUEUE = int(os.getenv("WATERMARK_QUEUE", "16"))
+# "jpeg", "webp", "avif" or "auto" (smaller of jpeg/webp)
+WATERMARK_FORMAT = os.getenv("WATERMARK_FORMAT", "jpeg")
+# Reposts are served from a disk cache of finished outputs (0 MB disables it)
+WATERMARK_CACHE_DIR = os.getenv("WATERMARK_CACHE_DIR", ".cache/watermarks")
+WATERMARK_CACHE_MB = int(os.getenv("WATERMARK_CACHE_MB", "512"))
+
+# Link previews: wait for Discord's embed update up to a per-host budget learned
+# from past previews (PREVIEW_TIMEOUT until a host has history, capped at
+# PREVIEW_MAX_TIMEOUT), then optionally re-fetch the message once in case the
+# update was missed
+PREVIEW_TIMEOUT = float(os.getenv("PREVIEW_TIMEOUT", "2.0"))
+PREVIEW_MAX_TIMEOUT = float(os.getenv("PREVIEW_MAX_TIMEOUT", "5.0"))
+PREVIEW_FALLBACK_FETCH = os.getenv("PREVIEW_FALLBACK_FETCH", "1") != "0"
+PREVIEW_TIMINGS_PATH = os.getenv("PREVIEW_TIMINGS_PATH", ".cache/preview_timings.json")
+
+# Forwarded deals are queued and handled by up to INTAKE_WORKERS at once (mostly
+# waiting on link previews); only their final sends are serialized, per
+# destination channel, so deals still post in the order they arrived
+INTAKE_WORKERS = int(os.getenv("INTAKE_WORKERS", "16"))
+INTAKE_QUEUE = int(os.getenv("INTAKE_QUEUE", "100"))
+
+# Optional webhook delivery: destination channel IDs listed in WEBHOOK_CHANNELS
+# (comma-separated) get deals through a bot-owned webhook instead of bot sends
+WEBHOOK_CHANNEL_IDS = {int(x) for x in os.getenv("WEBHOOK_CHANNELS", "").split(",") if x.strip()}
+WEBHOOK_POOL_SIZE = int(os.getenv("WEBHOOK_POOL_SIZE", "20"))
+
+# Footer logo: a permanent LOGO_URL, or logo.png uploaded once to LOGO_CHANNEL
+# (default TEST_CHANNEL) with its signed CDN URL re-read every LOGO_REFRESH_HOURS
+LOGO_CHANNEL = int(os.getenv("LOGO_CHANNEL") or TEST_CHANNEL)
+LOGO_REFRESH_HOURS = float(os.getenv("LOGO_REFRESH_HOURS", "12"))
+logo_task = None
+
+# Built by main(), so watermark workers and other importers don't open stores,
+# scan caches or create a client
+bot = None
+channels = None
+owners = None
+wm_engine = None
+preview_timings = None
+webhooks = None
+intake_queue = None
+
+# Discord upload limits
+MAX_FILES_PER_MESSAGE = 10
+DEFAULT_UPLOAD_LIMIT = 25 * 1024 * 1024   # DMs / unknown guild tier
+UPLOAD_OVERHEAD = 64 * 1024               # multipart headers + message payload
+
+# Category color helper (source preview color only; routing recolor handled in embed_system)
+CHANNEL_COLOR_MAP = {
+    # Original channels
+    "major": discord.Color.red(),
+    "minor": discord.Color.orange(),
+    "member": discord.Color.green(),
+    "food": discord.Color.gold(),
+    
+    # New flip channels
+    "online": discord.Color.blue(),
+    "target": discord.Color.red(),
+    "walmart": discord.Color.green(),
+    "seasonal": discord.Color.orange(),
+    "thrift": discord.Color.purple(),
+    "flight-deals": discord.Color.gold(),
+    "small-price-errors": discord.Color.dark_red(),
+    "chipotle": discord.Color.teal(),
+    "food": discord.Color.dark_gold(),
+}
+
+
+def chunk_uploads(results, max_files=MAX_FILES_PER_MESSAGE, max_bytes=DEFAULT_UPLOAD_LIMIT):
+    """Group watermark results (in order) into batches of at most max_files and max_bytes total.
+
+    A single result larger than max_bytes still gets its own batch so the
+    caller sees Discord's error for it.
+    """
+    batch, size = [], 0
+    for result in results:
+        n = len(result.data)
+        if batch and (len(batch) >= max_files or size + n > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(result)
+        size += n
+    if batch:
+        yield batch
+
+
+async def on_ready():
+    try:
+        await channels.warm()
+    except channel_registry.ChannelUnavailable as e:
+        # Fail fast rather than dropping deals later
+        print(f"FATAL: {e}")
+        await bot.close()
+        return
+    print(f"Logged in as {bot.user}; {len(channels)} configured channels resolved")
+
+    global logo_task
+    if not os.getenv("LOGO_URL") and logo_task is None:
+        logo_task = asyncio.create_task(refresh_logo())
+
+
+async def refresh_logo():
+    while True:
+        try:
+            channel = channels.get(LOGO_CHANNEL) or await bot.fetch_channel(LOGO_CHANNEL)
+            url = await embed_generator.publish_logo(channel)
+            print(f"Footer logo URL refreshed: {url}")
+        except Exception as e:
+            print(f"Could not publish footer logo (footers stay text-only): {e}")
+        await asyncio.sleep(LOGO_REFRESH_HOURS * 3600)
+
+
+async def on_guild_channel_update(before, after):
+    channels.update(after)
+
+
+async def on_guild_channel_delete(channel):
+    channels.remove(channel)
+
+
+async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
+    # Raw event: fires for uncached (old) messages too, and needs no fetch
+    if str(payload.emoji) != "🗑️":
+        return
+
+    owner_id = owners.get(payload.message_id)
+    if owner_id is None or payload.user_id != owner_id:
+        return
+
+    partial = bot.get_partial_messageable(payload.channel_id).get_partial_message(payload.message_id)
+    try:
+        await partial.delete()
+    except discord.NotFound:
+        pass
+    except discord.Forbidden:
+        return
+    owners.pop(payload.message_id)
+
+
+async def on_message(message: discord.Message):
+    if message.author.bot:
+        return
+    
+    if message.content.strip().lower().startswith(';'):
+        return
+
+    # SUCCESS watermark flow
+    if message.channel.id == SUCCESS_ID and message.attachments:
+        # filter images
+        atts = [a for a in message.attachments
+                if a.filename.lower().endswith(('.png', '.jpg', '.jpeg', '.webp'))]
+
+        if not atts:
+            return
+
+        owner_id = message.author.id
+
+        async def watermark(att):
+            img_data = await att.read()
+            # run PIL in the worker pool so we don't block the event loop
+            return await wm_engine.submit(img_data, watermark_path='watermark.png',
+                                          output_format=WATERMARK_FORMAT)
+
+        # Watermark every attachment concurrently
+        results = await asyncio.gather(*(watermark(att) for att in atts), return_exceptions=True)
+        outputs, failures = [], []
+        for att, result in zip(atts, results):
+            if isinstance(result, Exception):
+                failures.append(f"`{att.filename}`: `{result}`")
+                continue
+            print(f"Watermarked {att.filename}: {result.format} q={result.quality} encodes={result.encodes} "
+                  f"queued={result.queued_s:.2f}s render={result.render_s:.2f}s "
+                  f"cached={result.cached} depth={wm_engine.queue_depth}")
+            outputs.append(result)
+
+        # Send them together, split only by Discord's per-message file count / size limits
+        limit = message.guild.filesize_limit if message.guild else DEFAULT_UPLOAD_LIMIT
+        n = 0
+        for batch in chunk_uploads(outputs, max_bytes=limit - UPLOAD_OVERHEAD):
+            files = []
+            for result in batch:
+                n += 1
+                # Discord derives the content type from the extension
+                files.append(discord.File(io.BytesIO(result.data),
+                                          filename=f"watermarked_{n}.{result.extension}"))
+            try:
+                sent_message = await message.channel.send(f"{message.author.mention}", files=files)
+                await sent_message.add_reaction("🗑️")
+                owners.set(sent_message.id, owner_id)
+            except Exception as e:
+                failures.append(f"{len(files)} image(s): `{e}`")
+
+        if failures:
+            await message.channel.send("⚠️ Failed " + "\n".join(failures))
+
+        # delete AFTER sending
+        try:
+            await message.delete()
+        except Exception:
+            pass
+
+        return
+
+
+    # Forwarded deals are handled by the intake workers (see process_deal)
+    if message.channel.id in SOURCE_CHANNEL_IDS:
+        await intake_queue.submit(deal_destination(message.channel.id), message)
+
+    await bot.process_commands(message)
+
+
+def send_deal(channel, **kwargs):
+    """channel.send(), or a webhook post if the channel is in WEBHOOK_CHANNELS."""
+    if channel.id in WEBHOOK_CHANNEL_IDS:
+        return webhooks.send_or_fallback(channel, **kwargs)
+    return channel.send(**kwargs)
+
+
+def delivery_label(name: str, channel_id: int) -> str:
+    return f"{name} (webhook)" if channel_id in WEBHOOK_CHANNEL_IDS else name
+
+
+def deal_destination(source_channel_id: int) -> int:
+    """Intake ordering key: the channel a deal from source_channel_id is posted to.
+
+    Original channels all post a copy to TEST_CHANNEL, so they share its key.
+    """
+    return FORWARDING_TO_MAIN_MAP.get(source_channel_id, TEST_CHANNEL)
+
+
+async def process_deal(message: discord.Message, turn: intake.Turn):
+    cache = embed_generator.parse_cache_info()
+    queue = intake_queue.stats()
+    print(f"Processing message from forwarding server: {message.channel.name} ({message.channel.id}) "
+          f"[parse cache {cache['hit_rate']:.0%} hits, {cache['size']} entries; "
+          f"intake depth {queue['queue_depth']}, avg wait {queue['avg_wait_s'] * 1000:.0f}ms]")
+    
+    # Check if this is a new flip channel (direct forwarding)
+    if message.channel.id in FORWARDING_TO_MAIN_MAP:
+        # Handle new flip channels - direct forwarding
+        main_channel_id = FORWARDING_TO_MAIN_MAP.get(message.channel.id)
+        main_channel = channels.get(main_channel_id)
+        if not main_channel:
+            print(f"Could not find main server channel {main_channel_id}")
+            return
+
+        # Wait for previews if needed
+        url_match = embed_generator.URL_RE.search(message.content)
+        if url_match and not message.attachments:
+            msg = await preview_timings.wait(bot, message, url_match.group(1),
+                                             fallback_fetch=PREVIEW_FALLBACK_FETCH)
+        else:
+            msg = message
+
+        parsed_data = embed_generator.parse_extracted_text(msg.content, message=msg)
+
+        if not parsed_data.get("thumbnail_url"):
+            thumb_from_embed = embed_generator.first_embed_image_url(msg)
+            if thumb_from_embed:
+                parsed_data["thumbnail_url"] = thumb_from_embed
+                print("DING DONG")
+
+        # Determine category based on source channel
+        category = None
+        if message.channel.id == ONLINE_FLIPS_FID:
+            category = "online"
+        elif message.channel.id == TARGET_FLIPS_FID:
+            category = "target"
+        elif message.channel.id == WALMART_FLIPS_FID:
+            category = "walmart"
+        elif message.channel.id == SEASONAL_FLIPS_FID:
+            category = "seasonal"
+        elif message.channel.id == THRIFT_FLIPS_FID:
+            category = "thrift"
+        elif message.channel.id == FLIGHT_FLIPS_FID:
+            category = "flight-deals"
+        elif message.channel.id == SMALL_PRICE_ERRORS_FID:
+            category = "small-price-errors"
+        elif message.channel.id == CHIPOTLE_FID:
+            category = "chipotle"
+        elif message.channel.id == FOOD_FID:
+            category = "food"
+
+        # Create embeds with multiple image support
+        embeds, view = embed_generator.create_multiple_image_embeds(
+            parsed_data,
+            category=category,
+            allow_edit=True,
+            editor_user_ids={610239586454601763},  # <-- your admin IDs
+            include_channel_buttons=False,  # No routing buttons needed for direct forwarding
+            channel_buttons=[],
+            channel_buttons_disable_after_send=False
+        )
+
+        if not embeds or not hasattr(embeds[0], "to_dict"):
+            print("DEBUG: embeds is not valid. Type:", type(embeds))
+            return
+
+        # Add footer to all embeds
+        for embed in embeds:
+            embed_generator.apply_footer(embed, "Pricehub")
+
+        # Send directly to main server channel, after earlier deals for it
+        async with turn:
+            result = await delivery.fan_out({
+                delivery_label(main_channel.name, main_channel_id): lambda: send_deal(main_channel, embeds=embeds),
+            })
+            if not result.ok:
+                # Fallback: send original message content
+                await main_channel.send(content=f"**Forwarded from {message.channel.name}:**\n{message.content}")
+        print(f"Forwarded {message.id}: {result.summary()} [waited {turn.wait_s * 1000:.0f}ms for its turn]")
+    
+    else:
+        # Handle original channels - with channel buttons
+        target_channel = message.channel
+
+        # Wait for previews if needed
+        url_match = embed_generator.URL_RE.search(message.content)
+        if url_match and not message.attachments:
+            msg = await preview_timings.wait(bot, message, url_match.group(1),
+                                             fallback_fetch=PREVIEW_FALLBACK_FETCH)
+        else:
+            msg = message
+
+        parsed_data = embed_generator.parse_extracted_text(msg.content, message=msg)
+
+        if not parsed_data.get("thumbnail_url"):
+            thumb_from_embed = embed_generator.first_embed_image_url(msg)
+            if thumb_from_embed:
+                parsed_data["thumbnail_url"] = thumb_from_embed
+                print("DING DONG")
+
+        # Source channel category (for initial preview color)
+        category = message.channel.name.lower() if message.channel.name.lower() in CHANNEL_COLOR_MAP else None
+
+        # Build embed + a composite view that already includes:
+        # - link buttons
+        # - Edit / Advanced buttons
+        # - routing buttons (major/minor/member/food)
+        channel_buttons = [
+            {"label": "major",    "dest_id": MAJOR_ID,    "mention_everyone": True, "role_id": "1407983913581936712", "webhook": MAJOR_ID in WEBHOOK_CHANNEL_IDS},
+            {"label": "minor",    "dest_id": MINOR_ID,    "mention_everyone": False, "role_id": "1407984094255644722", "webhook": MINOR_ID in WEBHOOK_CHANNEL_IDS},
+            {"label": "member",   "dest_id": MEMBER_ID,   "mention_everyone": False, "role_id": "1407984234127294546", "webhook": MEMBER_ID in WEBHOOK_CHANNEL_IDS},
+            {"label": "food",     "dest_id": FOOD_ID,     "mention_everyone": False, "role_id": "1407984369733210204", "webhook": FOOD_ID in WEBHOOK_CHANNEL_IDS},
+        ]
+
+        # Use multiple embeds for multiple images (quadrant layout)
+        embeds, view = embed_generator.create_multiple_image_embeds(
+            parsed_data,
+            category=category,
+            allow_edit=True,
+            editor_user_ids={610239586454601763},  # <-- your admin IDs
+            include_channel_buttons=True,
+            channel_buttons=channel_buttons,
+            channel_buttons_disable_after_send=True  # allow sending to multiple channels after edits
+        )
+
+        if not embeds or not hasattr(embeds[0], "to_dict"):
+            print("DEBUG: embeds is not valid. Type:", type(embeds))
+            return
+
+        # Add footer to all embeds (the test channel gets its own copies)
+        for embed in embeds:
+            embed_generator.apply_footer(embed, "Pricehub")
+        test_embeds = [embed.copy() for embed in embeds]
+        for embed in test_embeds:
+            embed_generator.apply_footer(embed, "PriceHub")
+
+        # Preview in source channel and test channel go out concurrently
+        # (multiple embeds display in a grid-like layout)
+        sends = {}
+        if target_channel:
+            await view.save()  # button state must be stored before anyone can click
+            sends["preview"] = lambda: target_channel.send(embeds=embeds, view=view)
+        test_channel = channels.get(TEST_CHANNEL)
+        if test_channel:
+            sends[delivery_label("test", TEST_CHANNEL)] = lambda: send_deal(
+                test_channel, content="<@&1405692608747143219>", embeds=test_embeds)
+        else:
+            print(f"Test channel {TEST_CHANNEL} not available")
+        async with turn:
+            result = await delivery.fan_out(sends)
+        print(f"Posted {message.id}: {result.summary()} [waited {turn.wait_s * 1000:.0f}ms for its turn]")
+
+
+def main():
+    global bot, channels, owners, wm_engine, preview_timings, webhooks, intake_queue
+    bot = MirrorBot(command_prefix="!", intents=intents)
+    for handler in (on_ready, on_guild_channel_update, on_guild_channel_delete, on_raw_reaction_add, on_message):
+        bot.event(handler)
+    # Deal buttons (Edit/Advanced/routing) are dispatched by custom_id, so they work on
+    # messages sent before a restart too (state lives in the DEAL_STORE file)
+    bot.add_dynamic_items(*embed_generator.DYNAMIC_ITEMS)
+
+    channels = channel_registry.ChannelRegistry(bot, CONFIGURED_CHANNELS)
+    bot.channel_registry = channels  # RouteButton looks channels up through this
+    owners = ownership_store.OwnershipStore(OWNERSHIP_DB, ttl_s=OWNERSHIP_TTL_DAYS * 86400)
+    wm_cache = (watermark_cache.WatermarkCache(WATERMARK_CACHE_DIR, WATERMARK_CACHE_MB * 1024 * 1024)
+                if WATERMARK_CACHE_MB > 0 else None)
+    wm_engine = watermark_engine.WatermarkEngine(workers=WATERMARK_WORKERS, queue_size=WATERMARK_QUEUE,
+                                                 cache=wm_cache)
+    preview_timings = preview_timing.PreviewTimings(PREVIEW_TIMINGS_PATH, default_timeout=PREVIEW_TIMEOUT,
+                                                    max_timeout=PREVIEW_MAX_TIMEOUT)
+    webhooks = webhook_delivery.WebhookSender(bot, name="Pricehub", avatar_url=embed_generator.logo_url,
+                                              pool_size=WEBHOOK_POOL_SIZE)
+    bot.webhook_sender = webhooks  # RouteButton sends through this for webhook-enabled buttons
+    intake_queue = intake.IntakeQueue(process_deal, workers=INTAKE_WORKERS, queue_size=INTAKE_QUEUE)
+
+    bot.run(BOT_TOKEN)
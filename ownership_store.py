@@ -0,0 +1,30 @@
+# ownership_store.py
+# Who may 🗑️-delete which bot message: SQLite-backed with TTL expiry and an in-memory LRU in front.
+
+from typing import Optional
+
+from ttl_store import TTLStore
+
+
+class OwnershipStore(TTLStore):
+    """message_id -> owner user id, kept for ``ttl_s`` seconds after it's set.
+
+    The LRU (see TTLStore) keeps negative answers too, since most reactions
+    are on untracked messages.
+    """
+
+    TABLE = "owners"
+    KEY_COLUMN = "message_id"
+    KEY_TYPE = "INTEGER"
+    VALUE_COLUMN = "owner_id"
+    VALUE_TYPE = "INTEGER"
+
+    def get(self, message_id: int) -> Optional[int]:
+        """Owner of message_id, or None if it isn't tracked (or has expired)."""
+        return self._get(message_id)
+
+    def set(self, message_id: int, owner_id: int) -> None:
+        self._put(message_id, owner_id)
+
+    def pop(self, message_id: int) -> None:
+        self._delete(message_id)
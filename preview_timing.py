@@ -0,0 +1,176 @@
+# preview_timing.py
+# Learns, per URL host, how long Discord takes to attach link previews (and whether it ever does).
+
+import json
+import os
+import time
+from collections import deque
+from typing import Optional
+from urllib.parse import urlparse
+
+import discord
+
+import embed_generator
+
+TIMINGS_VERSION = 1
+
+
+def host_of(url: str) -> str:
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _p90(values: list) -> float:
+    vals = sorted(values)
+    return vals[min(len(vals) - 1, int(len(vals) * 0.9))]
+
+
+def _age(message: discord.Message) -> float:
+    """Seconds since message was posted (from its snowflake), never negative."""
+    return max(0.0, (discord.utils.utcnow() - message.created_at).total_seconds())
+
+
+class PreviewTimings:
+    """Rolling per-host record of preview latency, used as the wait budget.
+
+    Each host keeps its last ``window`` outcomes: seconds until the preview
+    showed up, or None if it never did. Once a host has ``min_samples``
+    previews the budget is their p90 times ``headroom``, clamped to
+    [min_timeout, max_timeout]; until then it is ``default_timeout``. Hosts
+    that almost never produce previews get a budget of 0 (don't wait), except
+    for every ``explore_every``-th message, which is waited on with the
+    default budget so the host can recover if that changes.
+    """
+
+    def __init__(self, path: Optional[str] = None, default_timeout: float = 2.0,
+                 min_timeout: float = 0.3, max_timeout: float = 5.0, window: int = 50,
+                 min_samples: int = 5, skip_after: int = 10, skip_ratio: float = 0.05,
+                 explore_every: int = 20, headroom: float = 1.2, save_interval: float = 60.0):
+        self.path = path
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.window = window
+        self.min_samples = min_samples
+        self.skip_after = skip_after
+        self.skip_ratio = skip_ratio
+        self.explore_every = explore_every
+        self.headroom = headroom
+        self.save_interval = save_interval
+        self._hosts: dict[str, deque] = {}
+        self._skipped: dict[str, int] = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+        if path:
+            self.load()
+
+    def _outcomes(self, host: str) -> deque:
+        if host not in self._hosts:
+            self._hosts[host] = deque(maxlen=self.window)
+        return self._hosts[host]
+
+    def _never_previews(self, outcomes) -> bool:
+        if len(outcomes) < self.skip_after:
+            return False
+        hits = sum(1 for x in outcomes if x is not None)
+        return hits / len(outcomes) < self.skip_ratio
+
+    def budget(self, host: str) -> float:
+        """Seconds to wait for a preview from host (0 = don't wait)."""
+        outcomes = self._hosts.get(host)
+        if not outcomes:
+            return self.default_timeout
+        if self._never_previews(outcomes):
+            n = self._skipped.get(host, 0) + 1
+            self._skipped[host] = n
+            return self.default_timeout if n % self.explore_every == 0 else 0.0
+        latencies = [x for x in outcomes if x is not None]
+        if len(latencies) < self.min_samples:
+            return self.default_timeout
+        return min(self.max_timeout, max(self.min_timeout, _p90(latencies) * self.headroom))
+
+    def record(self, host: str, latency: Optional[float]) -> None:
+        """Log one outcome for host: seconds until the preview appeared, or None."""
+        self._outcomes(host).append(latency)
+        self._dirty = True
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Save any unsaved outcomes (the bot calls this on shutdown)."""
+        if not self.path:
+            return
+        try:
+            self.save()
+        except OSError as e:
+            print(f"Could not save preview timings: {e}")
+
+    async def wait(self, client: discord.Client, message: discord.Message, url: str,
+                   fallback_fetch: bool = True) -> discord.Message:
+        """embed_generator.wait_for_embeds with a per-host budget; records the outcome.
+
+        Latency and budget both count from when the message was posted, not
+        from when this wait started (the deal may have sat in the intake queue).
+        A preview that was already there on entry has no measurable latency and
+        isn't recorded, and neither is a wait whose budget ran out while queued.
+        """
+        if message.embeds:
+            return message
+        host = host_of(url)
+        budget = self.budget(host)
+        if budget <= 0:
+            return message
+        remaining = budget - _age(message)
+        if remaining <= 0:
+            if not fallback_fetch:
+                return message
+            return await embed_generator.wait_for_embeds(client, message, timeout=0,
+                                                         fallback_fetch=True)
+        msg = await embed_generator.wait_for_embeds(client, message, timeout=remaining,
+                                                    fallback_fetch=fallback_fetch)
+        # A preview found by the fallback fetch is recorded with its (late) time
+        # so the p90 grows to cover it next time.
+        self.record(host, _age(message) if msg.embeds else None)
+        return msg
+
+    def load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable preview timings {self.path}: {e}")
+            return
+        if data.get("version") != TIMINGS_VERSION:
+            return
+        for host, outcomes in (data.get("hosts") or {}).items():
+            self._hosts[host] = deque(outcomes, maxlen=self.window)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {"version": TIMINGS_VERSION,
+                "hosts": {h: [None if x is None else round(x, 3) for x in o] for h, o in self._hosts.items()}}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def stats(self) -> dict:
+        """host -> {samples, previews, p90_s, skipped} for logging/inspection."""
+        out = {}
+        for host, outcomes in self._hosts.items():
+            latencies = [x for x in outcomes if x is not None]
+            out[host] = {
+                "samples": len(outcomes),
+                "previews": len(latencies),
+                "p90_s": _p90(latencies) if latencies else None,
+                "skipped": self._never_previews(outcomes),
+            }
+        return out
@@ -1,61 +1,333 @@
-from PIL import Image
-import io, random
-
-# Pillow resampling fallback (older/newer versions)
-try:
-    RESAMPLE = Image.Resampling.LANCZOS
-except AttributeError:
-    RESAMPLE = Image.LANCZOS
-
-def add_image_watermark(
-    image_bytes,
-    watermark_path='watermark.png',
-    scale_factor=0.25,
-    opacity=0.2,
-    margin_x=20,
-    margin_y=20,
-    max_dim=3000,                 # downscale massive images
-    target_max_bytes=24_000_000   # stay under typical Discord cap
-):
-    """
-    Returns a BytesIO ready for discord.File(...), ALWAYS as JPEG.
-    """
-    base_img = Image.open(io.BytesIO(image_bytes))
-    base = base_img.convert("RGBA")
-    W, H = base.size
-
-    # Downscale huge inputs
-    if max(W, H) > max_dim:
-        s = max_dim / float(max(W, H))
-        base = base.resize((int(W*s), int(H*s)), RESAMPLE)
-        W, H = base.size
-
-    # Watermark prep
-    wm = Image.open(watermark_path).convert("RGBA")
-    w_w = max(1, int(W * scale_factor))
-    w_h = max(1, int(wm.height * (w_w / wm.width)))
-    wm = wm.resize((w_w, w_h), RESAMPLE)
-    r, g, b, a = wm.split()
-    a = a.point(lambda px: int(px * opacity))
-    wm.putalpha(a)
-
-    # Tile watermark
-    overlay = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-    for y in range(0, H, w_h + margin_y):
-        for x in range(0, W, w_w + margin_x):
-            overlay.alpha_composite(wm, dest=(x, y))
-
-    out = Image.alpha_composite(base, overlay).convert("RGB")
-
-    # Compress adaptively as JPEG
-    buf = io.BytesIO()
-    quality = 90
-    while True:
-        buf.seek(0); buf.truncate(0)
-        out.save(buf, format="JPEG", quality=quality, optimize=True)
-        if buf.tell() <= target_max_bytes or quality <= 30:
-            break
-        quality = max(30, quality - 8)
-
-    buf.seek(0)
-    return buf
+from PIL import Image, features
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
+import io, os, random
+
+# Pillow resampling fallback (older/newer versions)
+try:
+    RESAMPLE = Image.Resampling.LANCZOS
+except AttributeError:
+    RESAMPLE = Image.LANCZOS
+
+# Cache sizes. Prepared tiles are tiny. Overlay planes are full-size RGBA (a
+# 3000x3000 plane is ~36MB) and every watermark worker process keeps its own
+# cache, so that one is capped by bytes: WATERMARK_WORKERS x OVERLAY_CACHE_BYTES
+# in total. Planes bigger than the cap are built per call and never kept.
+WATERMARK_CACHE_SIZE = 32
+OVERLAY_CACHE_BYTES = 48 * 1024 * 1024
+
+# Quality search bounds (same range the old 90, 82, 74 ... 30 ladder covered)
+MAX_QUALITY = 90
+MIN_QUALITY = 30
+MAX_FULL_ENCODES = 4
+# Side length of the downscaled trial image used to predict full-size bytes
+PROBE_DIM = 512
+# Refuse inputs with more pixels than this before decoding them (~200MB as RGBA)
+MAX_INPUT_PIXELS = 50_000_000
+
+# Output formats: Pillow format -> (save options, file extension, content type)
+OUTPUT_FORMATS = {
+    "JPEG": ({"optimize": True}, "jpg", "image/jpeg"),
+    "WEBP": ({"method": 4}, "webp", "image/webp"),
+}
+if features.check("avif"):
+    OUTPUT_FORMATS["AVIF"] = ({"speed": 8}, "avif", "image/avif")
+# output_format="auto" keeps whichever of these comes out smaller
+AUTO_FORMATS = ("JPEG", "WEBP")
+
+
+class EncodeResult(NamedTuple):
+    buf: io.BytesIO
+    quality: int
+    encodes: int   # full-size encodes
+    probes: int    # downscaled trial encodes
+    format: str = "JPEG"
+
+    @property
+    def extension(self):
+        return OUTPUT_FORMATS[self.format][1]
+
+    @property
+    def content_type(self):
+        return OUTPUT_FORMATS[self.format][2]
+
+
+@lru_cache(maxsize=WATERMARK_CACHE_SIZE)
+def _prepared_watermark(watermark_path, mtime, w_w, opacity):
+    """Watermark resized to w_w wide with its alpha scaled by opacity.
+
+    mtime is only part of the cache key, so swapping watermark.png on disk
+    invalidates old entries. Callers must not mutate the returned image.
+    """
+    wm = Image.open(watermark_path).convert("RGBA")
+    w_h = max(1, int(wm.height * (w_w / wm.width)))
+    wm = wm.resize((w_w, w_h), RESAMPLE)
+    r, g, b, a = wm.split()
+    a = a.point([int(px * opacity) for px in range(256)])
+    wm.putalpha(a)
+    return wm
+
+
+_overlay_cache = OrderedDict()  # args -> overlay plane, least recently used first
+_overlay_stats = {"hits": 0, "misses": 0, "bytes": 0}
+
+
+def _tiled_overlay(W, H, watermark_path, mtime, scale_factor, opacity, margin_x, margin_y):
+    """Full-size transparent plane with the watermark tiled across it.
+
+    Served from an LRU capped at OVERLAY_CACHE_BYTES. Callers must not mutate
+    the returned image.
+    """
+    key = (W, H, watermark_path, mtime, scale_factor, opacity, margin_x, margin_y)
+    overlay = _overlay_cache.get(key)
+    if overlay is not None:
+        _overlay_cache.move_to_end(key)
+        _overlay_stats["hits"] += 1
+        return overlay
+    _overlay_stats["misses"] += 1
+
+    overlay = _build_overlay(*key)
+    nbytes = W * H * 4
+    if nbytes <= OVERLAY_CACHE_BYTES:
+        _overlay_cache[key] = overlay
+        _overlay_stats["bytes"] += nbytes
+        while _overlay_stats["bytes"] > OVERLAY_CACHE_BYTES:
+            _, old = _overlay_cache.popitem(last=False)
+            _overlay_stats["bytes"] -= old.width * old.height * 4
+    return overlay
+
+
+def _build_overlay(W, H, watermark_path, mtime, scale_factor, opacity, margin_x, margin_y):
+    w_w = max(1, int(W * scale_factor))
+    wm = _prepared_watermark(watermark_path, mtime, w_w, opacity)
+
+    if margin_x < 0 or margin_y < 0:
+        # Overlapping tiles have to be blended one by one
+        return _tile_overlay_loop(W, H, wm, margin_x, margin_y)
+    return _tile_overlay_rows(W, H, wm, margin_x, margin_y)
+
+
+def _tile_overlay_loop(W, H, wm, margin_x, margin_y):
+    """Reference tiler: one alpha_composite call per tile."""
+    w_w, w_h = wm.size
+    overlay = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+    for y in range(0, H, w_h + margin_y):
+        for x in range(0, W, w_w + margin_x):
+            overlay.alpha_composite(wm, dest=(x, y))
+    return overlay
+
+
+def _tile_overlay_rows(W, H, wm, margin_x, margin_y):
+    """Build one tiled row, then stamp it down the plane.
+
+    With non-negative margins the tiles never overlap, so every pixel is
+    composited at most once onto transparent black. Doing that once for a
+    single row and copying the row with paste() gives exactly the same pixels
+    as _tile_overlay_loop with cols + rows Pillow calls instead of cols * rows.
+    """
+    w_w, w_h = wm.size
+    row = Image.new("RGBA", (W, w_h), (0, 0, 0, 0))
+    for x in range(0, W, w_w + margin_x):
+        row.alpha_composite(wm, dest=(x, 0))
+
+    overlay = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+    for y in range(0, H, w_h + margin_y):
+        overlay.paste(row, (0, y))
+    return overlay
+
+
+def cache_stats():
+    """Hit/miss counters for the watermark and overlay caches."""
+    return {
+        "watermark": _prepared_watermark.cache_info()._asdict(),
+        "overlay": dict(_overlay_stats, entries=len(_overlay_cache), max_bytes=OVERLAY_CACHE_BYTES),
+    }
+
+
+def clear_caches():
+    _prepared_watermark.cache_clear()
+    _overlay_cache.clear()
+    _overlay_stats.update(hits=0, misses=0, bytes=0)
+
+
+def _encode(img, quality, fmt="JPEG"):
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, quality=quality, **OUTPUT_FORMATS[fmt][0])
+    return buf
+
+
+def encode_within(img, target_max_bytes, fmt="JPEG",
+                  max_quality=MAX_QUALITY, min_quality=MIN_QUALITY,
+                  max_encodes=MAX_FULL_ENCODES):
+    """Encode img as fmt at the highest quality that fits target_max_bytes.
+
+    The first full-size encode is at max_quality. After that, sizes are
+    predicted from encodes of a downscaled copy, scaled up by the pixel ratio
+    and corrected by every full-size encode we actually do. The prediction
+    picks each further candidate quality; the full-size encodes then narrow
+    a [lo, hi] bracket, so at most max_encodes full encodes are spent (plus one
+    at min_quality if nothing fit, matching the old loop's floor).
+    """
+    W, H = img.size
+    factor = max(1, max(W, H) // PROBE_DIM)
+    if factor == 1:
+        # A "probe" would be the image itself; search with real encodes
+        return _bisect_quality(img, target_max_bytes, fmt, max_quality, min_quality, max_encodes)
+    probe = img.reduce(factor)
+    pixel_ratio = (W * H) / float(probe.width * probe.height)
+
+    probe_sizes = {}
+    def predicted(q):
+        if q not in probe_sizes:
+            probe_sizes[q] = _encode(probe, q, fmt).tell()
+        return probe_sizes[q] * pixel_ratio * correction
+
+    correction = 1.0
+    lo, hi = min_quality, max_quality
+    best, encodes = None, 0
+    while lo <= hi and encodes < max_encodes:
+        if encodes == 0:
+            # max_quality is always tried for real first: it usually fits (one
+            # encode, like the old ladder), and if not its size calibrates the
+            # predictions, which tend to overestimate
+            predicted(hi)
+            q, hit = hi, True
+        else:
+            # Highest quality in [lo, hi] predicted to fit
+            a, b, q, hit = lo, hi, lo, False
+            if predicted(hi) <= target_max_bytes:
+                q, a, hit = hi, hi + 1, True
+            while a <= b:
+                mid = (a + b) // 2
+                if predicted(mid) <= target_max_bytes:
+                    q, a, hit = mid, mid + 1, True
+                else:
+                    b = mid - 1
+        if best is not None and not hit:
+            # Already have a fit and nothing higher is expected to fit
+            break
+
+        buf = _encode(img, q, fmt)
+        encodes += 1
+        correction = buf.tell() / (probe_sizes[q] * pixel_ratio)
+        if buf.tell() <= target_max_bytes:
+            best = (buf, q)
+            lo = q + 1
+        else:
+            hi = q - 1
+
+    if best is None:
+        if hi < min_quality:
+            # min_quality itself was tried and is still too big; use it anyway
+            best = (buf, q)
+        else:
+            best = (_encode(img, min_quality, fmt), min_quality)
+            encodes += 1
+
+    buf, quality = best
+    buf.seek(0)
+    return EncodeResult(buf, quality, encodes, len(probe_sizes), fmt)
+
+
+def _bisect_quality(img, target_max_bytes, fmt, max_quality, min_quality, max_encodes):
+    """encode_within for images too small to downscale: max_quality first, then bisection."""
+    lo, hi = min_quality, max_quality
+    q, best, buf, encodes = max_quality, None, None, 0
+    while lo <= hi and encodes < max_encodes:
+        buf = _encode(img, q, fmt)
+        encodes += 1
+        if buf.tell() <= target_max_bytes:
+            best = (buf, q)
+            lo = q + 1
+        else:
+            hi = q - 1
+        q = (lo + hi + 1) // 2
+
+    if best is None:
+        if hi < min_quality:
+            best = (buf, min_quality)
+        else:
+            best = (_encode(img, min_quality, fmt), min_quality)
+            encodes += 1
+
+    buf, quality = best
+    buf.seek(0)
+    return EncodeResult(buf, quality, encodes, 0, fmt)
+
+
+def open_downscaled(image_bytes, max_dim, max_pixels=MAX_INPUT_PIXELS):
+    """Decode image_bytes as RGBA with its longest side at most max_dim.
+
+    Only the header is read before the pixel budget is checked, so oversized
+    inputs are rejected before any pixel buffer is allocated. JPEGs (and
+    MPOs) are decoded with draft() at the smallest DCT scale still >= the target size,
+    and other formats are resized in their own mode before the RGBA
+    conversion, so the full-resolution RGBA copy never exists.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    W, H = img.size
+    if W * H > max_pixels:
+        raise Image.DecompressionBombError(
+            f"Image has {W * H} pixels ({W}x{H}), over the {max_pixels} pixel budget"
+        )
+
+    if max(W, H) <= max_dim:
+        return img.convert("RGBA")
+
+    s = max_dim / float(max(W, H))
+    size = (int(W*s), int(H*s))
+    # Reduced DCT decode for JPEGs, including the MPO files many phones produce;
+    # a no-op for other formats
+    img.draft("RGB", size)
+    if img.mode not in ("L", "LA", "RGB", "RGBA", "CMYK"):
+        # Palette/bilevel/16-bit images can't be LANCZOS-resized as-is
+        img = img.convert("RGBA")
+    img = img.resize(size, RESAMPLE, reducing_gap=3.0)
+    return img.convert("RGBA")
+
+
+def render_watermark(
+    image_bytes,
+    watermark_path='watermark.png',
+    scale_factor=0.25,
+    opacity=0.2,
+    margin_x=20,
+    margin_y=20,
+    max_dim=3000,                 # downscale massive images
+    target_max_bytes=24_000_000,  # stay under typical Discord cap
+    max_pixels=MAX_INPUT_PIXELS,  # refuse decompression bombs
+    output_format="jpeg",         # "jpeg", "webp", "avif" (if Pillow has it) or "auto"
+):
+    """
+    Watermarks image_bytes and returns an EncodeResult (encoded buf + its
+    format, the chosen quality and how many encodes it took).
+    """
+    fmt = output_format.upper().replace("JPG", "JPEG")
+    if fmt != "AUTO" and fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format {output_format!r}")
+
+    base = open_downscaled(image_bytes, max_dim, max_pixels)
+    W, H = base.size
+
+    # Watermark prep + tiling (cached per watermark file / output size)
+    mtime = os.stat(watermark_path).st_mtime_ns
+    overlay = _tiled_overlay(W, H, watermark_path, mtime, scale_factor, opacity, margin_x, margin_y)
+
+    out = Image.alpha_composite(base, overlay).convert("RGB")
+
+    if fmt != "AUTO":
+        return encode_within(out, target_max_bytes, fmt)
+
+    results = [encode_within(out, target_max_bytes, f) for f in AUTO_FORMATS]
+    best = min(results, key=lambda r: (r.buf.getbuffer().nbytes > target_max_bytes,
+                                       r.buf.getbuffer().nbytes))
+    return best._replace(encodes=sum(r.encodes for r in results),
+                         probes=sum(r.probes for r in results))
+
+
+def add_image_watermark(image_bytes, watermark_path='watermark.png', **kwargs):
+    """
+    Returns a BytesIO ready for discord.File(...), JPEG unless output_format says otherwise.
+    """
+    return render_watermark(image_bytes, watermark_path, **kwargs).buf
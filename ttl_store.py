@@ -0,0 +1,100 @@
+# ttl_store.py
+# Shared skeleton of the SQLite-backed stores: one key -> value table with TTL expiry and an in-memory LRU in front.
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_MISSING = (None, 0.0)  # cached "no row" lookup; already expired
+
+
+class TTLStore:
+    """key -> value, kept for ``ttl_s`` seconds after its last write.
+
+    Subclasses name the table and its two columns (TABLE, KEY_COLUMN/KEY_TYPE,
+    VALUE_COLUMN/VALUE_TYPE) and wrap _get/_put/_delete in their own API.
+    Lookups are answered from an LRU of the last ``cache_size`` keys (negative
+    answers included) and fall through to a primary-key lookup in SQLite.
+    Expired rows are purged every ``purge_every`` writes. Safe to call from
+    several threads.
+    """
+
+    TABLE = ""
+    KEY_COLUMN = "key"
+    KEY_TYPE = "TEXT"
+    VALUE_COLUMN = "value"
+    VALUE_TYPE = "BLOB"
+
+    def __init__(self, path: str, ttl_s: float = 30 * 86400, cache_size: int = 4096, purge_every: int = 500):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.cache_size = cache_size
+        self.purge_every = purge_every
+        self._cache: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+            f" {self.KEY_COLUMN} {self.KEY_TYPE} PRIMARY KEY,"
+            f" {self.VALUE_COLUMN} {self.VALUE_TYPE} NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._select_sql = f"SELECT {self.VALUE_COLUMN}, expires_at FROM {self.TABLE} WHERE {self.KEY_COLUMN} = ?"
+        self._upsert_sql = (f"INSERT OR REPLACE INTO {self.TABLE} ({self.KEY_COLUMN}, {self.VALUE_COLUMN}, expires_at)"
+                            " VALUES (?, ?, ?)")
+        self._delete_sql = f"DELETE FROM {self.TABLE} WHERE {self.KEY_COLUMN} = ?"
+        self.purge_expired()
+
+    def _remember(self, key: Hashable, entry: tuple) -> None:
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        """Stored value for key, or None if there is none (or it has expired)."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                row = self._db.execute(self._select_sql, (key,)).fetchone()
+                entry = tuple(row) if row else _MISSING
+            self._remember(key, entry)
+        value, expires_at = entry
+        return value if expires_at > time.time() else None
+
+    def _put(self, key: Hashable, value: Any) -> None:
+        expires_at = time.time() + self.ttl_s
+        with self._lock:
+            self._db.execute(self._upsert_sql, (key, value, expires_at))
+            self._remember(key, (value, expires_at))
+            self._writes += 1
+            purge = self._writes % self.purge_every == 0
+        if purge:
+            self.purge_expired()
+
+    def _delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._db.execute(self._delete_sql, (key,))
+            self._remember(key, _MISSING)
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._db.execute(f"DELETE FROM {self.TABLE} WHERE expires_at <= ?", (time.time(),))
+            return cur.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,132 @@
+# watermark_cache.py
+# Disk-backed LRU of watermarked outputs, keyed by a hash of the input bytes + render params.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+# Bump when render output changes for the same inputs, to orphan old entries
+CACHE_VERSION = 1
+
+# Entry file extension <-> image format
+EXTENSION_FORMATS = {".jpg": "JPEG", ".webp": "WEBP", ".avif": "AVIF"}
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp", "AVIF": ".avif"}
+
+
+class CachedOutput(NamedTuple):
+    data: bytes
+    quality: int
+    format: str = "JPEG"
+
+
+class WatermarkCache:
+    """Size-capped directory of rendered outputs with LRU eviction.
+
+    Entries are stored as ``<key>-q<quality>.<ext>``. Recency is kept in memory
+    and mirrored to file mtimes, so the LRU order survives a restart.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, tuple[str, int, int]]" = OrderedDict()  # key -> (filename, quality, size)
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        entries = []
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            key, sep, q = stem.rpartition("-q")
+            if ext not in EXTENSION_FORMATS or not sep or not q.isdigit():
+                continue
+            st = os.stat(os.path.join(self.directory, name))
+            entries.append((st.st_mtime, key, name, int(q), st.st_size))
+        for _, key, name, quality, size in sorted(entries):
+            self._index[key] = (name, quality, size)
+            self._size += size
+        self._evict()
+
+    @staticmethod
+    def make_key(image_bytes: bytes, params: dict) -> str:
+        """Hash of the input bytes, the render params and the watermark file's mtime."""
+        h = hashlib.sha256(image_bytes)
+        wm_path = params.get("watermark_path", "watermark.png")
+        try:
+            wm_mtime = os.stat(wm_path).st_mtime_ns
+        except OSError:
+            wm_mtime = 0
+        h.update(repr((CACHE_VERSION, sorted(params.items()), wm_mtime)).encode())
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[CachedOutput]:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+        name, quality, _ = entry
+        fmt = EXTENSION_FORMATS[os.path.splitext(name)[1]]
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            # Deleted behind our back
+            with self._lock:
+                if self._index.pop(key, None):
+                    self._size -= entry[2]
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return CachedOutput(data, quality, fmt)
+
+    def put(self, key: str, data: bytes, quality: int, fmt: str = "JPEG") -> None:
+        if len(data) > self.max_bytes:
+            return
+        name = f"{key}-q{quality}{FORMAT_EXTENSIONS[fmt]}"
+        path = os.path.join(self.directory, name)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old:
+                self._size -= old[2]
+                if old[0] != name:
+                    self._remove(old[0])
+            self._index[key] = (name, quality, len(data))
+            self._size += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._index:
+            _, (name, _, size) = self._index.popitem(last=False)
+            self._size -= size
+            self._remove(name)
+
+    def _remove(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,177 @@
+# watermark_engine.py
+# Runs success_overlay.render_watermark in a process pool behind a bounded job queue.
+
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple, Optional
+
+import success_overlay
+from watermark_cache import WatermarkCache
+
+
+class EngineBusy(Exception):
+    """Raised by submit(wait=False) when the job queue is full."""
+
+
+class WatermarkJobResult(NamedTuple):
+    data: bytes       # encoded image
+    quality: int
+    encodes: int
+    queued_s: float   # time spent waiting for a free worker
+    render_s: float   # time spent inside the worker process
+    format: str = "JPEG"
+    cached: bool = False
+
+    @property
+    def extension(self) -> str:
+        return success_overlay.OUTPUT_FORMATS[self.format][1]
+
+    @property
+    def content_type(self) -> str:
+        return success_overlay.OUTPUT_FORMATS[self.format][2]
+
+
+def _render_job(image_bytes: bytes, kwargs: dict) -> tuple:
+    # Runs in a worker process; keep the return value small and picklable.
+    t0 = time.perf_counter()
+    res = success_overlay.render_watermark(image_bytes, **kwargs)
+    return res.buf.getvalue(), res.quality, res.encodes, res.format, time.perf_counter() - t0
+
+
+class WatermarkEngine:
+    """Bounded-concurrency watermarking on a process pool.
+
+    ``workers`` processes each run one job at a time; at most ``queue_size``
+    further jobs wait in the queue. ``submit()`` blocks (backpressure) while the
+    queue is full, or raises EngineBusy with ``wait=False``. With a ``cache``,
+    repeat inputs are answered from disk without queueing at all.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: int = 16, history: int = 100,
+                 cache: Optional[WatermarkCache] = None):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.queue_size = queue_size
+        self.cache = cache
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatchers: list[asyncio.Task] = []
+        self._recent = deque(maxlen=history)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.running = 0
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # The pool starts inside the running bot (threads, gateway socket, SQLite
+        # handles), so workers come from a forkserver rather than a fork of it
+        return ProcessPoolExecutor(max_workers=self.workers,
+                                   mp_context=multiprocessing.get_context("forkserver"))
+
+    def _start(self) -> None:
+        self._pool = self._new_pool()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            image_bytes, kwargs, fut, enqueued_at = await self._queue.get()
+            queued_s = time.perf_counter() - enqueued_at
+            self.running += 1
+            pool = self._pool
+            try:
+                if fut.cancelled():
+                    continue
+                data, quality, encodes, fmt, render_s = await loop.run_in_executor(
+                    pool, _render_job, image_bytes, kwargs
+                )
+            except BrokenProcessPool as e:
+                # A worker died (OOM kill etc.); replace the pool for later jobs,
+                # unless another dispatcher already did
+                self.failed += 1
+                if self._pool is pool:
+                    self._pool = self._new_pool()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                if not fut.done():
+                    fut.set_exception(e)
+            except Exception as e:
+                self.failed += 1
+                if not fut.done():
+                    fut.set_exception(e)
+            else:
+                self.completed += 1
+                result = WatermarkJobResult(data, quality, encodes, queued_s, render_s, fmt)
+                self._recent.append((queued_s, render_s))
+                if not fut.done():
+                    fut.set_result(result)
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+
+    async def submit(self, image_bytes: bytes, *, wait: bool = True, **kwargs) -> WatermarkJobResult:
+        """Watermark image_bytes; kwargs are passed to success_overlay.render_watermark."""
+        if self.cache is None:
+            return await self._submit(image_bytes, wait, kwargs)
+
+        key = await asyncio.to_thread(WatermarkCache.make_key, image_bytes, kwargs)
+        hit = await asyncio.to_thread(self.cache.get, key)
+        if hit is not None:
+            return WatermarkJobResult(hit.data, hit.quality, 0, 0.0, 0.0, hit.format, cached=True)
+        result = await self._submit(image_bytes, wait, kwargs)
+        try:
+            await asyncio.to_thread(self.cache.put, key, result.data, result.quality, result.format)
+        except OSError as e:
+            print(f"Watermark cache write failed: {e}")
+        return result
+
+    async def _submit(self, image_bytes: bytes, wait: bool, kwargs: dict) -> WatermarkJobResult:
+        if self._pool is None:
+            self._start()
+        fut = asyncio.get_running_loop().create_future()
+        job = (image_bytes, kwargs, fut, time.perf_counter())
+        if wait:
+            await self._queue.put(job)
+        else:
+            try:
+                self._queue.put_nowait(job)
+            except asyncio.QueueFull:
+                self.rejected += 1
+                raise EngineBusy(f"watermark queue full ({self.queue_size} jobs waiting)") from None
+        self.submitted += 1
+        return await fut
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def stats(self) -> dict:
+        recent = list(self._recent)
+        n = len(recent) or 1
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "queue_size": self.queue_size,
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_queued_s": sum(q for q, _ in recent) / n,
+            "avg_render_s": sum(r for _, r in recent) / n,
+            "cache": self.cache.stats() if self.cache else None,
+        }
+
+    async def close(self) -> None:
+        for task in self._dispatchers:
+            task.cancel()
+        self._dispatchers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._queue = None
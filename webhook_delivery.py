@@ -0,0 +1,182 @@
+# webhook_delivery.py
+# Optional delivery of forwarded deals through per-channel webhooks instead of the bot's channel sends.
+
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+import discord
+
+
+class WebhookUnavailable(Exception):
+    """The channel's webhook couldn't be found or created (usually missing Manage Webhooks)."""
+
+
+class WebhookRateLimit:
+    """Per-webhook bucket state from Discord's X-RateLimit-* headers.
+
+    Sends through one webhook are serialized by ``lock``; before each send
+    ``wait()`` sleeps until the bucket has room again.
+    """
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        self.limited = 0          # sends that had to wait for the bucket
+        self.limited_s = 0.0      # total time spent waiting
+
+    async def wait(self) -> None:
+        if self.remaining == 0:
+            delay = self.reset_at - time.monotonic()
+            if delay > 0:
+                self.limited += 1
+                self.limited_s += delay
+                await asyncio.sleep(delay)
+
+    def update(self, headers) -> None:
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is not None:
+            self.remaining = int(remaining)
+        if reset_after is not None:
+            self.reset_at = time.monotonic() + float(reset_after)
+
+    def retry_later(self, retry_after: float) -> None:
+        self.remaining = 0
+        self.reset_at = time.monotonic() + retry_after
+
+
+class WebhookSender:
+    """Posts embeds to channels through one bot-owned webhook per channel.
+
+    Webhook URLs are looked up (or created) once per channel with the bot's
+    REST client and cached; sends are raw POSTs on a pooled aiohttp session,
+    so they don't queue behind the bot's own per-channel send limits.
+    """
+
+    def __init__(self, client: discord.Client, name: str = "Pricehub",
+                 avatar_url: Optional[Callable[[], Optional[str]]] = None,
+                 pool_size: int = 20, max_retries: int = 3, history: int = 100,
+                 unavailable_retry_s: float = 600.0):
+        self.client = client
+        self.name = name
+        self.avatar_url = avatar_url
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.unavailable_retry_s = unavailable_retry_s
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._urls: Dict[int, str] = {}
+        self._url_locks: Dict[int, asyncio.Lock] = {}
+        self._unavailable: Dict[int, float] = {}  # channel id -> monotonic time to retry the lookup
+        self._limits: Dict[str, WebhookRateLimit] = {}
+        self._recent = deque(maxlen=history)  # send latency in seconds
+        self.sent = 0
+        self.failed = 0
+        self.fallbacks = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=15))
+        return self._session
+
+    async def webhook_url(self, channel: discord.TextChannel) -> str:
+        url = self._urls.get(channel.id)
+        if url:
+            return url
+        if self._unavailable.get(channel.id, 0.0) > time.monotonic():
+            # Don't repeat the REST lookup on every send while permissions are missing
+            raise WebhookUnavailable(f"no webhook for #{getattr(channel, 'name', channel.id)} (cached failure)")
+        lock = self._url_locks.setdefault(channel.id, asyncio.Lock())
+        async with lock:
+            if channel.id in self._urls:
+                return self._urls[channel.id]
+            try:
+                hooks = await channel.webhooks()
+                hook = next((h for h in hooks if h.token and h.name == self.name and h.user
+                             and h.user.id == self.client.user.id), None)
+                if hook is None:
+                    hook = await channel.create_webhook(name=self.name, reason="Deal forwarding")
+            except (discord.HTTPException, AttributeError) as e:
+                self._unavailable[channel.id] = time.monotonic() + self.unavailable_retry_s
+                raise WebhookUnavailable(f"no webhook for #{getattr(channel, 'name', channel.id)}: {e}") from e
+            self._urls[channel.id] = hook.url
+            return hook.url
+
+    async def send(self, channel: discord.TextChannel, *, content: Optional[str] = None,
+                   embeds: List[discord.Embed] = ()) -> dict:
+        """POST content/embeds to channel's webhook; returns the created message JSON."""
+        payload = {
+            "content": content,
+            "embeds": [e.to_dict() for e in embeds],
+            "username": self.name,
+            "allowed_mentions": {"parse": ["everyone", "roles", "users"]},
+        }
+        avatar = self.avatar_url() if self.avatar_url else None
+        if avatar:
+            payload["avatar_url"] = avatar
+
+        t0 = time.perf_counter()
+        try:
+            message = await self._post(channel, payload)
+        except Exception:
+            self.failed += 1
+            raise
+        self.sent += 1
+        self._recent.append(time.perf_counter() - t0)
+        return message
+
+    async def _post(self, channel: discord.TextChannel, payload: dict) -> dict:
+        for _ in range(self.max_retries + 1):
+            url = await self.webhook_url(channel)
+            limit = self._limits.setdefault(url, WebhookRateLimit())
+            async with limit.lock:
+                await limit.wait()
+                async with self._get_session().post(url, params={"wait": "true"}, json=payload) as resp:
+                    limit.update(resp.headers)
+                    if resp.status == 429:
+                        body = await resp.json(content_type=None)
+                        limit.retry_later(float(body.get("retry_after", 1.0)))
+                        continue
+                    if resp.status == 404:
+                        # Webhook was deleted; make a new one
+                        self._urls.pop(channel.id, None)
+                        self._limits.pop(url, None)
+                        continue
+                    if resp.status >= 400:
+                        raise discord.HTTPException(resp, await resp.text())
+                    return await resp.json()
+        raise WebhookUnavailable(f"gave up on #{getattr(channel, 'name', channel.id)} "
+                                 f"after {self.max_retries + 1} attempts")
+
+    async def send_or_fallback(self, channel: discord.TextChannel, *, content: Optional[str] = None,
+                               embeds: List[discord.Embed] = ()):
+        """send(), or a normal bot send if the channel has no usable webhook."""
+        try:
+            return await self.send(channel, content=content, embeds=embeds)
+        except WebhookUnavailable as e:
+            self.fallbacks += 1
+            print(f"Webhook delivery unavailable, sending as bot: {e}")
+            return await channel.send(content=content, embeds=list(embeds))
+
+    def stats(self) -> dict:
+        recent = sorted(self._recent)
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "fallbacks": self.fallbacks,
+            "webhooks": len(self._urls),
+            "avg_latency_s": sum(recent) / len(recent) if recent else 0.0,
+            "p90_latency_s": recent[int(len(recent) * 0.9)] if recent else 0.0,
+            "rate_limited": sum(l.limited for l in self._limits.values()),
+            "rate_limited_s": sum(l.limited_s for l in self._limits.values()),
+        }
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None